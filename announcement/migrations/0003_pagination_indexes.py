@@ -0,0 +1,21 @@
+# Generated by Django 4.0.2 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcement', '0002_alter_announcement_classroom'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['classroom', 'created_at'], name='announcemen_classro_f3d64a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['announcement', 'created_at'], name='announcemen_announc_ca700a_idx'),
+        ),
+    ]
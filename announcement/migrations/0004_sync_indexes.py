@@ -0,0 +1,21 @@
+# Generated by Django 4.0.2 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcement', '0003_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['classroom', 'edited_at'], name='announcemen_classro_005c2f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_at'], name='announcemen_created_f77bde_idx'),
+        ),
+    ]
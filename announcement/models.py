@@ -10,8 +10,14 @@ class Announcement(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     edited_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['classroom', 'created_at']),
+            models.Index(fields=['classroom', 'edited_at']),
+        ]
+
     def get_comments(self):
-        return self.comment_set.all().order_by('created_at')
+        return self.comment_set.select_related('author').order_by('created_at', 'id')
 
     def __str__(self):
         return self.text
@@ -23,5 +29,11 @@ class Comment(models.Model):
     author = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['announcement', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+
     def __str__(self):
         return self.text
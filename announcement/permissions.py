@@ -1,49 +1,39 @@
-from classroom.models import Classroom
-from django.shortcuts import get_object_or_404
+from classroom.context import get_classroom_context
 from rest_framework.permissions import BasePermission
 
-from .models import Announcement, Comment
-
 
 class IsAnnouncementPartOfClassroom(BasePermission):
     def has_permission(self, request, view):
-        code = view.kwargs['code']
-        announcement_id = view.kwargs['announcement_id']
-        classroom = get_object_or_404(Classroom, code=code)
-        announcement = get_object_or_404(Announcement, id=announcement_id)
+        context = get_classroom_context(request, view.kwargs)
+        announcement = context.get_announcement(view.kwargs['announcement_id'])
 
-        return announcement.classroom == classroom
+        return announcement.classroom_id == context.classroom.id
 
 
 class IsCommentPartOfAnnouncement(BasePermission):
     def has_permission(self, request, view):
-        announcement_id = view.kwargs['announcement_id']
-        comment_id = view.kwargs['comment_id']
-        announcement = get_object_or_404(Announcement, id=announcement_id)
-        comment = get_object_or_404(Comment, id=comment_id)
+        context = get_classroom_context(request, view.kwargs)
+        announcement = context.get_announcement(view.kwargs['announcement_id'])
+        comment = context.get_comment(view.kwargs['comment_id'])
 
-        return comment.announcement == announcement
+        return comment.announcement_id == announcement.id
 
 
 class IsTeacherOrAnnouncementAuthor(BasePermission):
     def has_permission(self, request, view):
-        code = view.kwargs['code']
-        announcement_id = view.kwargs['announcement_id']
-        classroom = get_object_or_404(Classroom, code=code)
-        announcement = get_object_or_404(Announcement, id=announcement_id)
+        context = get_classroom_context(request, view.kwargs)
+        announcement = context.get_announcement(view.kwargs['announcement_id'])
 
         user = request.user
         if request.method == 'DELETE' or request.method == 'PUT':
-            return classroom.is_user_a_teacher(user) or announcement.author == user
+            return context.is_teacher or announcement.author_id == user.id
 
 
 class IsTeacherOrCommentAuthor(BasePermission):
     def has_permission(self, request, view):
-        code = view.kwargs['code']
-        comment_id = view.kwargs['comment_id']
-        classroom = get_object_or_404(Classroom, code=code)
-        comment = get_object_or_404(Comment, id=comment_id)
+        context = get_classroom_context(request, view.kwargs)
+        comment = context.get_comment(view.kwargs['comment_id'])
 
         user = request.user
         if request.method == 'DELETE' or request.method == 'PUT':
-            return classroom.is_user_a_teacher(user) or comment.author == user
+            return context.is_teacher or comment.author_id == user.id
@@ -12,6 +12,13 @@ class AnnouncementSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'created_at', 'edited_at')
 
 
+class AnnouncementWithCommentCountSerializer(AnnouncementSerializer):
+    comment_count = serializers.IntegerField()
+
+    class Meta(AnnouncementSerializer.Meta):
+        fields = AnnouncementSerializer.Meta.fields + ('comment_count',)
+
+
 class NewAnnouncementSerializer(serializers.ModelSerializer):
     class Meta:
         model = Announcement
@@ -1,6 +1,9 @@
-from classroom.models import Classroom
+from api.conditional import ConditionalListMixin
+from api.deletion import TombstoneDestroyMixin
+from api.models import Tombstone
+from classroom.cache import ClassroomResponseCacheMixin
+from classroom.context import get_classroom_context
 from classroom.permissions import IsTeacherOrStudent
-from django.shortcuts import get_object_or_404
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 
@@ -9,13 +12,14 @@ from announcement.permissions import (IsAnnouncementPartOfClassroom,
                                       IsTeacherOrAnnouncementAuthor,
                                       IsTeacherOrCommentAuthor)
 
-from .models import Announcement, Comment
 from .serializers import (AnnouncementSerializer, CommentSerializer,
                           NewAnnouncementSerializer, NewCommentSerializer)
 
 
-class Announcements(generics.ListCreateAPIView):
+class Announcements(ConditionalListMixin, ClassroomResponseCacheMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsTeacherOrStudent]
+    ordering = ('-created_at', 'id')
+    tombstone_model = Tombstone.ANNOUNCEMENT
 
     def get_serializer_class(self):
         method = self.request.method
@@ -25,32 +29,35 @@ class Announcements(generics.ListCreateAPIView):
             return NewAnnouncementSerializer
 
     def get_queryset(self):
-        code = self.kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        classroom = get_classroom_context(self.request, self.kwargs).classroom
         return classroom.get_announcements()
 
     def perform_create(self, serializer):
-        code = self.kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        classroom = get_classroom_context(self.request, self.kwargs).classroom
         serializer.save(classroom=classroom, author=self.request.user)
 
 
-class AnnouncementDetail(generics.RetrieveUpdateDestroyAPIView):
+class AnnouncementDetail(TombstoneDestroyMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated, IsAnnouncementPartOfClassroom, IsTeacherOrAnnouncementAuthor]
     serializer_class = NewAnnouncementSerializer
 
     def get_object(self):
-        announcement_id = self.kwargs['announcement_id']
-        return get_object_or_404(Announcement, id=announcement_id)
+        context = get_classroom_context(self.request, self.kwargs)
+        return context.get_announcement(self.kwargs['announcement_id'])
 
     def perform_update(self, serializer):
-        code = self.kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        classroom = get_classroom_context(self.request, self.kwargs).classroom
         serializer.save(classroom=classroom, author=self.request.user)
 
 
-class AnnouncementComments(generics.ListCreateAPIView):
+class AnnouncementComments(ConditionalListMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsAnnouncementPartOfClassroom, IsTeacherOrStudent]
+    query_budget = 7
+    ordering = ('created_at', 'id')
+    # comments can not be edited
+    last_modified_field = 'created_at'
+    # the tombstones of comments are only kept per classroom
+    tombstone_model = Tombstone.COMMENT
 
     def get_serializer_class(self):
         method = self.request.method
@@ -60,19 +67,19 @@ class AnnouncementComments(generics.ListCreateAPIView):
             return NewCommentSerializer
 
     def get_queryset(self):
-        announcement_id = self.kwargs['announcement_id']
-        announcement = get_object_or_404(Announcement, id=announcement_id)
+        context = get_classroom_context(self.request, self.kwargs)
+        announcement = context.get_announcement(self.kwargs['announcement_id'])
         return announcement.get_comments()
 
     def perform_create(self, serializer):
-        announcement_id = self.kwargs['announcement_id']
-        announcement = get_object_or_404(Announcement, id=announcement_id)
+        context = get_classroom_context(self.request, self.kwargs)
+        announcement = context.get_announcement(self.kwargs['announcement_id'])
         serializer.save(announcement=announcement, author=self.request.user)
 
 
-class AnnouncementCommentDelete(generics.DestroyAPIView):
+class AnnouncementCommentDelete(TombstoneDestroyMixin, generics.DestroyAPIView):
     permission_classes = [IsAuthenticated, IsAnnouncementPartOfClassroom, IsCommentPartOfAnnouncement, IsTeacherOrCommentAuthor]
 
     def get_object(self):
-        comment_id = self.kwargs['comment_id']
-        return get_object_or_404(Comment, id=comment_id)
+        context = get_classroom_context(self.request, self.kwargs)
+        return context.get_comment(self.kwargs['comment_id'])
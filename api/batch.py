@@ -0,0 +1,75 @@
+import json
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from rest_framework.authentication import BaseAuthentication
+
+# headers of the batch request that every sub-request inherits
+INHERITED_META = ('SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR', 'SCRIPT_NAME', 'HTTP_HOST', 'HTTP_ACCEPT_LANGUAGE',
+                  'HTTP_USER_AGENT', 'HTTP_X_FORWARDED_FOR', 'HTTP_X_FORWARDED_PROTO')
+
+
+class BatchAuthentication(BaseAuthentication):
+    # sub-requests carry no credentials, they are authenticated as the batch request was.
+    # Listed last, the others find no credentials in them and the 401 of a request
+    # without any is still answered with their WWW-Authenticate header
+
+    def authenticate(self, request):
+        return getattr(request, 'batch_auth', None)
+
+
+def build_sub_request(request, method, path, body):
+    url = urlsplit(path)
+    content = json.dumps(body).encode() if body is not None and method != 'GET' else b''
+    environ = {key: value for key, value in request.META.items() if key in INHERITED_META}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(content)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': BytesIO(content),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+
+    # authenticated once by the batch request, see BatchAuthentication
+    sub_request.batch_auth = (request.user, request.auth)
+    # the classroom contexts of get_classroom_context are shared by all sub-requests
+    http_request = request._request
+    if not hasattr(http_request, 'classroom_contexts'):
+        http_request.classroom_contexts = {}
+    sub_request.classroom_contexts = http_request.classroom_contexts
+    return sub_request
+
+
+def dispatch(request, method, path, body):
+    sub_request = build_sub_request(request, method, path, body)
+    try:
+        match = resolve(sub_request.path_info)
+    except Resolver404:
+        return {'status': 404, 'body': {'detail': 'Not found.'}}
+
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    except Exception as exc:
+        response = response_for_exception(sub_request, exc)
+
+    if method != 'GET':
+        # rows cached by the contexts may have been changed or deleted
+        sub_request.classroom_contexts.clear()
+
+    # exports are streamed, they and other responses that are not JSON can not be batched
+    response.close()
+    is_json = response.get('Content-Type', '').startswith('application/json')
+    if response.streaming or (response.content and not is_json):
+        return {'status': 400, 'body': {'detail': 'Only requests answered with JSON can be batched.'}}
+
+    content = json.loads(response.content) if response.content else None
+    return {'status': response.status_code, 'body': content}
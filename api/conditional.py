@@ -0,0 +1,50 @@
+import hashlib
+
+from classroom.context import get_classroom_context
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Tombstone
+
+
+class ConditionalListMixin:
+    # answers If-None-Match / If-Modified-Since on a list endpoint from the newest
+    # timestamp and the row count of its queryset, without serializing anything
+    last_modified_field = 'edited_at'
+    # deleting a row leaves no timestamp in the list, its tombstone has one
+    tombstone_model = None
+
+    def get_last_deleted(self):
+        classroom = get_classroom_context(self.request, self.kwargs).classroom
+        return Tombstone.objects.filter(classroom_id=classroom.id, model=self.tombstone_model).aggregate(
+            last_deleted=Max('deleted_at'))['last_deleted']
+
+    def get_validators(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = queryset.aggregate(last_modified=Max(self.last_modified_field), count=Count('id'))
+        last_modified = max(filter(None, [validators['last_modified'], self.get_last_deleted()]), default=None)
+
+        # the same rows come out differently per page and renderer
+        key = '|'.join((
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            str(validators['count']),
+            last_modified.isoformat() if last_modified else '',
+        ))
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
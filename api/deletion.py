@@ -0,0 +1,153 @@
+import threading
+
+from announcement.models import Announcement, Comment
+from assignment.models import Assignment, Submission
+from classroom.models import Classroom
+from django.db import router, transaction
+from django.db.models.deletion import Collector
+
+from .events import get_classroom_channel, get_student_channel, get_teacher_channel, publish_on_commit
+from .models import Tombstone
+
+TOMBSTONE_MODELS = {
+    Announcement: Tombstone.ANNOUNCEMENT,
+    Comment: Tombstone.COMMENT,
+    Assignment: Tombstone.ASSIGNMENT,
+    Submission: Tombstone.SUBMISSION,
+}
+
+
+def get_tombstone(instance, classroom_id, classroom_code):
+    user_id = instance.student_id if isinstance(instance, Submission) else None
+    return Tombstone(model=TOMBSTONE_MODELS[type(instance)], object_id=instance.id, classroom_id=classroom_id,
+                     classroom_code=classroom_code, user_id=user_id)
+
+
+def publish_delete(instance, classroom_id):
+    event = {'type': f'{TOMBSTONE_MODELS[type(instance)]}.deleted', 'id': instance.id, 'classroom_id': classroom_id}
+    if isinstance(instance, Comment):
+        event['announcement'] = instance.announcement_id
+    if isinstance(instance, Submission):
+        event['assignment'] = instance.assignment_id
+        publish_on_commit(event, get_teacher_channel(classroom_id),
+                          get_student_channel(classroom_id, instance.student_id))
+    else:
+        publish_on_commit(event, get_classroom_channel(classroom_id))
+
+
+def get_classroom_ids(model, parent_field, instances, parents):
+    # the classrooms of the parents deleted along, the others are looked up at once
+    classroom_ids = {parent.id: parent.classroom_id for parent in parents}
+    missing = {getattr(instance, parent_field) for instance in instances} - classroom_ids.keys()
+    if missing:
+        classroom_ids.update(model.objects.filter(id__in=missing).values_list('id', 'classroom_id'))
+    return classroom_ids
+
+
+def record_deletes(data, using):
+    # writes the tombstones of the rows collected for a delete with one insert and adjusts
+    # only the counters of assignments that are not deleted along, in the transaction of
+    # the delete. The post_delete handlers skip the rows marked here
+    announcements = data.get(Announcement, set())
+    comments = data.get(Comment, set())
+    assignments = data.get(Assignment, set())
+    submissions = data.get(Submission, set())
+    announcement_classrooms = get_classroom_ids(Announcement, 'announcement_id', comments, announcements)
+    assignment_classrooms = get_classroom_ids(Assignment, 'assignment_id', submissions, assignments)
+
+    deleted_announcement_ids = {announcement.id for announcement in announcements}
+    deleted_assignment_ids = {assignment.id for assignment in assignments}
+    # (row, classroom id, whether its parent is deleted along)
+    deleted = [(announcement, announcement.classroom_id, False) for announcement in announcements]
+    deleted += [(assignment, assignment.classroom_id, False) for assignment in assignments]
+    deleted += [(comment, announcement_classrooms[comment.announcement_id],
+                 comment.announcement_id in deleted_announcement_ids) for comment in comments]
+    deleted += [(submission, assignment_classrooms[submission.assignment_id],
+                 submission.assignment_id in deleted_assignment_ids) for submission in submissions]
+
+    counters = {}
+    for submission in submissions:
+        if submission.assignment_id not in deleted_assignment_ids:
+            deltas = counters.setdefault(submission.assignment_id, {'total': 0, 'turned_in': 0, 'graded': 0})
+            deltas['total'] -= 1
+            deltas['graded' if submission.is_graded else 'turned_in'] -= 1
+
+    # the rows of a deleted classroom are only ever shown to its members, who learn
+    # of the classroom's deletion instead. Of the others only the deletion of a row
+    # whose parent survives is published, the children go with it
+    deleted_classroom_ids = {classroom.id for classroom in data.get(Classroom, ())}
+    deleted = [(row, classroom_id, with_parent) for row, classroom_id, with_parent in deleted
+               if classroom_id not in deleted_classroom_ids]
+    codes = dict(Classroom.objects.filter(id__in={classroom_id for _, classroom_id, _ in deleted}).values_list(
+        'id', 'code')) if deleted else {}
+
+    Tombstone.objects.using(using).bulk_create(get_tombstone(row, classroom_id, codes[classroom_id])
+                                               for row, classroom_id, _ in deleted)
+    # one update for the assignments whose counters change alike
+    assignment_ids = {}
+    for assignment_id, deltas in counters.items():
+        assignment_ids.setdefault(tuple(deltas.items()), []).append(assignment_id)
+    for deltas, ids in assignment_ids.items():
+        Assignment.objects.using(using).filter(id__in=ids).update_submission_counters(**dict(deltas))
+    for row, classroom_id, with_parent in deleted:
+        if not with_parent:
+            publish_delete(row, classroom_id)
+    rows = [*announcements, *comments, *assignments, *submissions]
+    for row in rows:
+        row._tombstoned = True
+    return rows
+
+
+def delete_with_tombstones(instance):
+    # deletes the instance and whatever cascades from it, recording the deleted rows at once
+    using = router.db_for_write(type(instance), instance=instance)
+    collector = Collector(using=using)
+    collector.collect([instance])
+    with transaction.atomic(using=using):
+        record_deletes(collector.data, using)
+        collector.delete()
+
+
+# the rows of the delete in progress, from their pre_delete signals until their post_delete
+# signals. A user's pre_delete is sent after those of the rows that cascade from it
+_pending = threading.local()
+
+
+def add_pending_delete(instance):
+    if not hasattr(_pending, 'rows'):
+        _pending.rows = []
+    _pending.rows.append(instance)
+
+
+def clear_pending_deletes():
+    _pending.rows = []
+
+
+def get_key(row):
+    return type(row), row.id
+
+
+def record_cascade(instance, using):
+    # a user deleted outside of delete_with_tombstones, in the admin or from a queryset:
+    # its cascade is collected again to be recorded at once, the rows the delete in
+    # progress collected are marked for its post_delete handlers
+    pending = getattr(_pending, 'rows', [])
+    if not pending:
+        return
+
+    collector = Collector(using=using)
+    collector.collect([instance])
+    # deleting several users, the rows of another's cascade are already recorded
+    recorded = {get_key(row) for row in pending if getattr(row, '_tombstoned', False)}
+    data = {model: {row for row in collector.data.get(model, ()) if get_key(row) not in recorded}
+            for model in TOMBSTONE_MODELS}
+    data[Classroom] = collector.data.get(Classroom, set())
+    keys = {get_key(row) for row in record_deletes(data, using)}
+    for row in pending:
+        if get_key(row) in keys:
+            row._tombstoned = True
+
+
+class TombstoneDestroyMixin:
+    def perform_destroy(self, instance):
+        delete_with_tombstones(instance)
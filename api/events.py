@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def get_classroom_channel(classroom_id):
+    return f'classroom:{classroom_id}'
+
+
+def get_teacher_channel(classroom_id):
+    return f'classroom:{classroom_id}:teacher'
+
+
+def get_student_channel(classroom_id, student_id):
+    return f'classroom:{classroom_id}:student:{student_id}'
+
+
+def get_user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish_on_commit(event, *channels):
+    # only after commit, subscribers react to an event by reading the rows it names
+    def publish():
+        backend = get_backend()
+        for channel in channels:
+            backend.publish(channel, event)
+
+    transaction.on_commit(publish)
+
+
+class Subscription:
+    queue_size = 100
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.queue_size)
+
+    def put(self, event):
+        # called from whichever thread published the event
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # the loop of a stream that is shutting down is already closed
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # a client this far behind has to catch up through /api/sync anyway
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalBackend:
+    # fans events out to the streams of this process only
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+    def deliver(self, channel, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self.lock:
+            for channel in channels:
+                self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscriptions = self.subscriptions.get(channel)
+                if subscriptions is None:
+                    continue
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[channel]
+
+
+class RedisBackend(LocalBackend):
+    # publishes through redis, every process listens and delivers to its own streams
+    prefix = 'classroom_events:'
+
+    def __init__(self):
+        import redis
+
+        super().__init__()
+        self.redis = redis.Redis.from_url(settings.REDIS_URL)
+        self.listener = None
+
+    def publish(self, channel, event):
+        self.redis.publish(self.prefix + channel, json.dumps(event))
+
+    def subscribe(self, channels):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, daemon=True)
+                self.listener.start()
+        return super().subscribe(channels)
+
+    def listen(self):
+        import redis
+
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for message in pubsub.listen():
+                    channel = message['channel'].decode()[len(self.prefix):]
+                    self.deliver(channel, json.loads(message['data']))
+            except redis.ConnectionError:
+                # events published while reconnecting are lost, clients catch up through /api/sync
+                time.sleep(1)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    path = settings.EVENTS_BACKEND
+    with _backends_lock:
+        if path not in _backends:
+            _backends[path] = import_string(path)()
+        return _backends[path]
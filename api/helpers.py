@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+
+from rest_framework.serializers import ValidationError
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def get_positive_int(query_params, name):
+    value = query_params.get(name)
+    if value is None:
+        return None
+
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: [f'{name} must be an integer']})
+    if value <= 0:
+        raise ValidationError({name: [f'{name} must be greater than zero']})
+    return value
+
+
+def get_upcoming_filters(query_params):
+    # ?limit= caps the number of assignments, ?days= drops those due further away than that
+    limit = get_positive_int(query_params, 'limit')
+    days = get_positive_int(query_params, 'days')
+    horizon = timedelta(days=days) if days is not None else None
+    return limit, horizon
+
+
+# sync cursors are server timestamps, as whole microseconds so that they need no escaping in a url
+
+
+def get_cursor(moment):
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def get_since(query_params):
+    since = get_positive_int(query_params, 'since')
+    if since is None:
+        return None
+
+    try:
+        return EPOCH + timedelta(microseconds=since)
+    except OverflowError:
+        raise ValidationError({'since': ['since is not a valid cursor']})
@@ -0,0 +1,111 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# IN lists make otherwise identical queries differ in their number of placeholders
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def get_fingerprint(sql):
+    return IN_LIST.sub('IN (...)', sql)
+
+
+# the query_budget of a view caps the queries of every request to it, authentication included
+def get_query_budget(request):
+    view = getattr(request.resolver_match, 'func', None)
+    return getattr(getattr(view, 'view_class', None), 'query_budget', None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.fingerprints = Counter()
+        # worker threads of the request record at the same time
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.duration += duration
+                self.count += 1
+                self.fingerprints[get_fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {fingerprint: count for fingerprint, count in self.fingerprints.items() if count > 1}
+
+
+_recorders = ContextVar('query_recorders', default=())
+
+
+@contextmanager
+def recording(recorder):
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        with connection.execute_wrapper(recorder):
+            yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+@contextmanager
+def recording_in_worker_thread():
+    # the queries a request hands to worker threads count for its recorders too
+    with ExitStack() as stack:
+        for recorder in _recorders.get():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+class QueryBudgetMiddleware:
+    # the rows of streamed responses are fetched after the middleware returned, they are not counted
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with recording(QueryRecorder()) as recorder:
+            response = self.get_response(request)
+
+        budget = get_query_budget(request)
+        duplicates = recorder.duplicates
+        over_budget = budget is not None and recorder.count > budget
+        if over_budget and settings.QUERY_BUDGET_ENFORCED:
+            raise QueryBudgetExceeded(f'{request.method} {request.path} ran {recorder.count} queries, '
+                                      f'{budget} allowed. Duplicated: {duplicates}')
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = recorder.count
+            response['X-Query-Time'] = round(recorder.duration * 1000, 1)
+            response['X-Query-Duplicates'] = sum(count - 1 for count in duplicates.values())
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_time_ms': round(recorder.duration * 1000, 1),
+            'budget': budget,
+            'duplicated': dict(Counter(duplicates).most_common(5)),
+        }
+        logger.log(logging.WARNING if over_budget or duplicates else logging.INFO, json.dumps(record))
+        return response
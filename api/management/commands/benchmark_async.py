@@ -0,0 +1,139 @@
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from assignment.models import Assignment, Submission
+from classroom.models import Classroom
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
+
+ENDPOINTS = ['classes', 'classes_enrolled', 'all_assignments_to_do', 'all_to_review', 'users/details']
+
+ASGI = ['classroom_project.asgi:application', '-k', 'uvicorn.workers.UvicornWorker']
+# the concurrent views on both workers tell apart what the worker and what the views change
+SERVERS = {
+    'gunicorn sync': (['classroom_project.wsgi'], '/api/'),
+    'gunicorn async': (['classroom_project.wsgi'], '/api/async/'),
+    'uvicorn sync': (ASGI, '/api/'),
+    'uvicorn async': (ASGI, '/api/async/'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare requests per second of the dashboard reads and their /api/async/ variants on sync gunicorn '
+            'workers and on async uvicorn workers. The servers run against the configured database, the rows '
+            'created are deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--duration', type=float, default=5, help='Seconds of load per endpoint and server')
+        parser.add_argument('--port', type=int, default=8731)
+        parser.add_argument('--classrooms', type=int, default=10)
+        parser.add_argument('--endpoints', nargs='+', default=ENDPOINTS)
+
+    def handle(self, *args, **options):
+        token = self.create_data(options['classrooms'])
+        try:
+            self.stdout.write(f'{"endpoint":<24} {"server":<14} {"req/s":>8} {"p50":>9} {"p95":>9} {"errors":>7}')
+            for server, (arguments, prefix) in SERVERS.items():
+                with self.run_server(arguments, options['workers'], options['port']):
+                    for endpoint in options['endpoints']:
+                        url = f'http://127.0.0.1:{options["port"]}{prefix}{endpoint}'
+                        rate, p50, p95, errors = self.load(url, token, options['concurrency'], options['duration'])
+                        self.stdout.write(f'{endpoint:<24} {server:<14} {rate:>8.1f} {p50:>7.1f}ms {p95:>7.1f}ms '
+                                          f'{errors:>7}')
+        finally:
+            Classroom.objects.filter(teacher__username__startswith='benchmark_async').delete()
+            get_user_model().objects.filter(username__startswith='benchmark_async').delete()
+
+    def create_data(self, count):
+        User = get_user_model()
+        user = User.objects.create(username='benchmark_async_user', first_name='Benchmark', last_name='User')
+        teacher = User.objects.create(username='benchmark_async_teacher', first_name='Benchmark', last_name='Teacher')
+        due_date_time = timezone.now() + timedelta(days=7)
+
+        for i in range(count):
+            # half of the classrooms are taught by the user, the other half they are enrolled in
+            taught = i % 2 == 0
+            classroom = Classroom.objects.create(teacher=user if taught else teacher, name=f'Benchmark {i}',
+                                                 subject='Benchmark')
+            classroom.students.add(teacher if taught else user)
+            for j in range(5):
+                assignment = Assignment.objects.create(classroom=classroom, title=f'Assignment {j}', text='Benchmark',
+                                                       due_date_time=due_date_time, points=10)
+                if taught and j % 2 == 0:
+                    Submission.objects.create(student=teacher, assignment=assignment, url='https://example.com')
+
+        token = AccessToken.objects.create(user=user, token='benchmark_async_token', scope='read write',
+                                           expires=timezone.now() + timedelta(hours=1))
+        return token.token
+
+    def run_server(self, arguments, workers, port):
+        command = self
+
+        class Server:
+            def __enter__(self):
+                env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'classroom_project.settings'}
+                self.process = subprocess.Popen(
+                    [sys.executable, '-m', 'gunicorn', *arguments, '-w', str(workers), '-b', f'127.0.0.1:{port}'],
+                    env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+                command.wait_until_up(port, self.process)
+
+            def __exit__(self, *exc_info):
+                self.process.terminate()
+                self.process.wait()
+
+        return Server()
+
+    def wait_until_up(self, port, process):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError('The server exited while starting')
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/api/users/details', timeout=1)
+            except urllib.error.HTTPError:
+                # a 401 means the server is up
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('The server did not start within 30 seconds')
+
+    def load(self, url, token, concurrency, duration):
+        request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'})
+        deadline = time.monotonic() + duration
+
+        def worker():
+            latencies = []
+            errors = 0
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=30) as response:
+                        response.read()
+                    latencies.append(time.perf_counter() - start)
+                except OSError:
+                    errors += 1
+            return latencies, errors
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(lambda _: worker(), range(concurrency)))
+        elapsed = time.monotonic() - start
+
+        latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+        errors = sum(worker_errors for _, worker_errors in results)
+        if not latencies:
+            return 0, 0, 0, errors
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000
+        return len(latencies) / elapsed, p50, p95, errors
@@ -0,0 +1,268 @@
+import json
+import logging
+from contextlib import nullcontext
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from time import perf_counter
+
+from announcement.models import Announcement, Comment
+from assignment.models import Assignment, Submission
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
+
+from api.instrumentation import QueryBudgetExceeded
+from api.testing import enforce_query_budgets, record_queries
+
+# rows are generated with a fixed seed so that the query counts of two runs compare
+DATASET = {'classrooms': 5, 'students': 40, 'assignments': 30, 'announcements': 20, 'comments': 5}
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                'LOCATION': 'benchmark_endpoints'}}
+# latency is compared on the median, the tail varies too much between runs on a busy machine. Differences
+# below the floor are noise on any machine
+NOISE_FLOOR_MS = 2
+
+
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+
+def get_route_names(patterns, prefix=''):
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= get_route_names(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern) and pattern.name and prefix.startswith('api/'):
+            names.add(pattern.name)
+    return names
+
+
+class Command(BaseCommand):
+    help = ('Request every route of the api through the test client against a test database filled by '
+            'generate_data. Reports latency percentiles and query counts and fails when a route runs more '
+            'queries, or is slower by more than --tolerance, than in the baseline. Every request starts with an '
+            'empty cache, writes are rolled back after each request.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--routes', nargs='+', help='Only benchmark the routes with these names')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'endpoints.json'))
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=1.0,
+                            help='Allowed p50 slowdown against the baseline, as a fraction')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        logger = logging.getLogger('api.instrumentation')
+        level = logger.level
+        # the per request log lines would drown the report
+        logger.setLevel(logging.WARNING)
+        try:
+            with override_settings(DEBUG=False, CACHES=BENCHMARK_CACHES), enforce_query_budgets:
+                call_command('generate_data', prefix='benchmark', seed=0, stdout=StringIO(), **DATASET)
+                results, failures = self.run_routes(options)
+        finally:
+            logger.setLevel(level)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        baseline_path = Path(options['baseline'])
+        baseline = None
+        if baseline_path.exists() and not options['save_baseline']:
+            baseline = json.loads(baseline_path.read_text())
+            if baseline['dataset'] != DATASET:
+                raise CommandError(f'{baseline_path} was recorded with another dataset, save a new baseline')
+        failures += self.report(results, baseline['routes'] if baseline else {}, options['tolerance'])
+
+        if options['save_baseline']:
+            if failures:
+                raise CommandError('Not saving a baseline of a failed run:\n' + '\n'.join(failures))
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({'dataset': DATASET, 'routes': results}, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f'Saved the baseline to {baseline_path}'))
+        elif baseline is None:
+            self.stdout.write(f'No baseline at {baseline_path}, store one with --save-baseline')
+
+        if failures:
+            raise CommandError(f'{len(failures)} route(s) failed:\n' + '\n'.join(failures))
+
+    def get_routes(self):
+        User = get_user_model()
+        now = timezone.now()
+        submission = Submission.objects.filter(student__username__startswith='benchmark_').select_related(
+            'assignment__classroom__teacher', 'student').order_by('id').first()
+        assignment = submission.assignment
+        classroom = assignment.classroom
+        teacher = classroom.teacher
+        student = submission.student
+        outsider = User.objects.create(username='benchmark_outsider', first_name='Benchmark', last_name='Outsider')
+        admin = User.objects.create(username='benchmark_admin', is_staff=True)
+
+        # rows that the writes below are allowed to change, whatever generate_data came up with
+        due = int((now + timedelta(days=7)).timestamp() * 1000)
+        open_assignment = Assignment.objects.create(classroom=classroom, title='Open', text='Benchmark', points=10,
+                                                    due_date_time=now + timedelta(days=7))
+        announcement = Announcement.objects.create(classroom=classroom, author=teacher, text='Benchmark')
+        comment = Comment.objects.create(announcement=announcement, author=student, text='Benchmark')
+
+        code = {'code': classroom.code}
+        assignment_kwargs = {**code, 'assignment_id': assignment.id}
+        announcement_kwargs = {**code, 'announcement_id': announcement.id}
+        assignment_data = {'title': 'Benchmark', 'text': 'Benchmark', 'due_date_time': due, 'points': 10}
+        batch = {'requests': [{'method': 'GET', 'path': reverse('classes')},
+                              {'method': 'GET', 'path': reverse('assignments', kwargs=code)},
+                              {'method': 'GET', 'path': reverse('announcements', kwargs=code)}]}
+
+        newcomers = User.objects.bulk_create(User(username=f'benchmark_newcomer_{i}',
+                                                  email=f'benchmark_newcomer_{i}@example.com') for i in range(20))
+        roster = [user.email for user in newcomers] + [student.email, 'benchmark_unknown@example.com']
+        bulk_grades = {'grades': [{'submission_id': submission_id, 'points': 5}
+                                  for submission_id in assignment.submission_set.values_list('id', flat=True)]}
+
+        # (route name, user, method, url kwargs, body), string bodies are sent as CSV
+        return [
+            ('user_details', student, 'get', {}, None),
+            ('classes', student, 'get', {}, None),
+            ('classes_enrolled', student, 'get', {}, None),
+            ('classes_teaching', teacher, 'get', {}, None),
+            ('classes_teaching', teacher, 'post', {}, {'name': 'Benchmark', 'subject': 'Benchmark'}),
+            ('all_assignments_to_do', student, 'get', {}, None),
+            ('all_upcoming_assignments', student, 'get', {}, None),
+            ('all_to_review', teacher, 'get', {}, None),
+            ('sync', student, 'get', {}, None),
+            ('batch', teacher, 'post', {}, batch),
+            ('async_classes', student, 'get', {}, None),
+            ('async_classes_enrolled', student, 'get', {}, None),
+            ('async_all_assignments_to_do', student, 'get', {}, None),
+            ('async_all_to_review', teacher, 'get', {}, None),
+            ('async_user_details', student, 'get', {}, None),
+            ('cache_stats', admin, 'get', {}, None),
+            ('classes_detail', student, 'get', code, None),
+            ('classes_detail', teacher, 'put', code, {'name': 'Benchmark', 'subject': 'Benchmark'}),
+            ('classes_detail', teacher, 'delete', code, None),
+            ('user_role', student, 'get', code, None),
+            ('classroom_dashboard', student, 'get', code, None),
+            ('gradebook', teacher, 'get', code, None),
+            ('gradebook_export', teacher, 'get', {**code, 'export_format': 'csv'}, None),
+            ('teaching_gradebook_export', teacher, 'get', {'export_format': 'csv'}, None),
+            ('student_submissions', teacher, 'get', {**code, 'student_id': student.id}, None),
+            ('announcements', student, 'get', code, None),
+            ('announcements', teacher, 'post', code, {'text': 'Benchmark'}),
+            ('announcement_detail', teacher, 'put', announcement_kwargs, {'text': 'Benchmark'}),
+            ('announcement_detail', teacher, 'delete', announcement_kwargs, None),
+            ('announcement_comments', student, 'get', announcement_kwargs, None),
+            ('announcement_comments', student, 'post', announcement_kwargs, {'text': 'Benchmark'}),
+            ('announcement_comment_delete', teacher, 'delete', {**announcement_kwargs, 'comment_id': comment.id},
+             None),
+            ('assignments', student, 'get', code, None),
+            ('assignments', teacher, 'post', code, assignment_data),
+            ('assignment_detail', student, 'get', assignment_kwargs, None),
+            ('assignment_detail', teacher, 'put', {**code, 'assignment_id': open_assignment.id}, assignment_data),
+            ('assignment_detail', teacher, 'delete', assignment_kwargs, None),
+            ('submissions', teacher, 'get', assignment_kwargs, None),
+            ('submissions', student, 'post', {**code, 'assignment_id': open_assignment.id},
+             {'url': 'https://example.com/benchmark'}),
+            ('grade_submission', teacher, 'patch', {**assignment_kwargs, 'submission_id': submission.id},
+             {'points': 5}),
+            ('bulk_grade_submissions', teacher, 'post', assignment_kwargs, bulk_grades),
+            ('student_submission', student, 'get', assignment_kwargs, None),
+            ('students', teacher, 'get', code, None),
+            ('students', outsider, 'post', code, None),
+            ('students_bulk', teacher, 'post', code, {'emails': roster}),
+            ('students_import', teacher, 'post', {**code, 'import_format': 'csv'},
+             'email\n' + ''.join(f'{email}\n' for email in roster)),
+            ('students_detail', teacher, 'get', {**code, 'student_id': student.id}, None),
+            ('students_detail', teacher, 'delete', {**code, 'student_id': student.id}, None),
+        ]
+
+    def run_routes(self, options):
+        routes = self.get_routes()
+        missing = get_route_names(get_resolver().url_patterns) - {name for name, *_ in routes}
+        if missing:
+            self.stdout.write(self.style.WARNING(f'Routes without a benchmark: {", ".join(sorted(missing))}'))
+        if options['routes']:
+            routes = [route for route in routes if route[0] in options['routes']]
+
+        tokens = {}
+        client = Client()
+        results = {}
+        failures = []
+        for name, user, method, kwargs, body in routes:
+            if user.id not in tokens:
+                tokens[user.id] = AccessToken.objects.create(
+                    user=user, token=f'benchmark_{user.id}', scope='read write',
+                    expires=timezone.now() + timedelta(days=1)).token
+            request_kwargs = {'HTTP_AUTHORIZATION': f'Bearer {tokens[user.id]}'}
+            if isinstance(body, str):
+                request_kwargs.update(data=body, content_type='text/csv')
+            elif body is not None:
+                request_kwargs.update(data=json.dumps(body), content_type='application/json')
+            url = reverse(name, kwargs=kwargs)
+            key = f'{method.upper()} {name}'
+
+            latencies = []
+            queries = 0
+            try:
+                # the first request warms up imports and connections and is not measured
+                for i in range(options['repeat'] + 1):
+                    cache.clear()
+                    # writes are undone so that every repetition does the same work. Reads run outside of a
+                    # transaction, the worker threads of ConcurrentListMixin query from connections of their own
+                    with transaction.atomic() if method != 'get' else nullcontext():
+                        with record_queries() as recorder:
+                            start = perf_counter()
+                            response = getattr(client, method)(url, **request_kwargs)
+                            if response.streaming:
+                                # exports run their queries while the body is produced
+                                b''.join(response.streaming_content)
+                            elapsed = perf_counter() - start
+                        if method != 'get':
+                            transaction.set_rollback(True)
+                    if response.status_code >= 400:
+                        failures.append(f'{key}: answered {response.status_code}')
+                        break
+                    if i:
+                        latencies.append(elapsed)
+                        queries = max(queries, recorder.count)
+            except QueryBudgetExceeded as exc:
+                failures.append(f'{key}: {exc}')
+            if latencies:
+                latencies.sort()
+                results[key] = {'p50': round(percentile(latencies, 0.5), 2),
+                                'p95': round(percentile(latencies, 0.95), 2),
+                                'p99': round(percentile(latencies, 0.99), 2), 'queries': queries}
+        return results, failures
+
+    def report(self, results, baseline, tolerance):
+        failures = []
+        self.stdout.write(f'{"route":<40} {"p50":>8} {"p95":>8} {"p99":>8} {"queries":>8} '
+                          f'{"base p50":>9} {"base q":>7}')
+        for key, result in results.items():
+            base = baseline.get(key)
+            line = (f'{key:<40} {result["p50"]:>6.2f}ms {result["p95"]:>6.2f}ms {result["p99"]:>6.2f}ms '
+                    f'{result["queries"]:>8}')
+            if base is None:
+                self.stdout.write(line)
+                continue
+
+            line += f' {base["p50"]:>7.2f}ms {base["queries"]:>7}'
+            slower = (result['p50'] > base['p50'] * (1 + tolerance)
+                      and result['p50'] - base['p50'] > NOISE_FLOOR_MS)
+            if result['queries'] > base['queries']:
+                failures.append(f'{key}: {result["queries"]} queries, {base["queries"]} in the baseline')
+            if slower:
+                failures.append(f'{key}: p50 {result["p50"]:.2f}ms, {base["p50"]:.2f}ms in the baseline')
+            if result['queries'] > base['queries'] or slower:
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        return failures
@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from classroom_project.views import generate_schema
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_spectacular.renderers import OpenApiJsonRenderer
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema into OPENAPI_SCHEMA_FILE, which api/schema/ serves outside of DEBUG.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=settings.OPENAPI_SCHEMA_FILE)
+
+    def handle(self, *args, **options):
+        content = OpenApiJsonRenderer().render(generate_schema(), renderer_context={})
+        Path(options['file']).write_bytes(content)
+        self.stdout.write(f'Wrote the schema to {options["file"]}')
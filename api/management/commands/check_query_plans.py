@@ -0,0 +1,90 @@
+import re
+from datetime import datetime, timezone
+
+from announcement.models import Announcement, Comment
+from assignment.models import Assignment, Submission
+from classroom.models import Classroom
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+
+from api.models import Tombstone
+
+# sqlite reports a full table scan as "SCAN <table>", scans through an index
+# read "SCAN <table> USING [COVERING] INDEX ..." and are fine. The table name is
+# matched whole, a shorter prefix of it must not pass the lookahead
+FULL_SCANS = {
+    'sqlite': re.compile(r'\bSCAN (\w+)(?!\w| USING)'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+def find_full_scans(plan, vendor):
+    return FULL_SCANS[vendor].findall(plan)
+
+
+def get_hot_queries():
+    # unsaved instances are enough, only their ids end up in the sql
+    classroom = Classroom(id=1, teacher_id=1)
+    announcement = Announcement(id=1, classroom_id=1)
+    assignment = Assignment(id=1, classroom_id=1, due_date_time=datetime.now(timezone.utc))
+    user = get_user_model()(id=1)
+    now = datetime.now(timezone.utc)
+
+    return {
+        'classroom by code': Classroom.objects.filter(code='code'),
+        'membership': classroom.students.filter(id=user.id),
+        'roster': classroom.get_all_students(),
+        'users by email': get_user_model().objects.annotate(email_lower=Lower('email')).filter(
+            email_lower__in=['a@example.com', 'b@example.com']),
+        'announcements': classroom.get_announcements(),
+        'comments': announcement.get_comments(),
+        'assignments': classroom.get_assignments(),
+        'upcoming assignments': classroom.get_upcoming_assignments(),
+        'all upcoming assignments': Assignment.objects.filter(classroom__students=user).upcoming(),
+        'student submission': Submission.objects.filter(assignment=assignment, student=user),
+        'submissions by status': Submission.objects.filter(assignment=assignment, status=Submission.GRADED),
+        'assignment submissions': assignment.get_all_submissions(),
+        'student submissions': classroom.get_student_submissions(user),
+        'gradebook submissions': Submission.objects.filter(assignment__classroom=classroom),
+        'assignments to do': Assignment.objects.todo_for(user).order_by('due_date_time', 'id'),
+        'assignments to review': Assignment.objects.filter(
+            classroom__teacher=user, graded_count__lt=F('submission_count')),
+        'changed announcements': Announcement.objects.filter(classroom_id__in=[1, 2], edited_at__gt=now),
+        'changed comments': Comment.objects.filter(announcement__classroom_id__in=[1, 2], created_at__gt=now),
+        'changed assignments': Assignment.objects.filter(classroom_id__in=[1, 2], edited_at__gt=now),
+        'changed submissions': Submission.objects.filter(assignment__classroom_id__in=[1, 2], edited_at__gt=now),
+        'deletions': Tombstone.objects.visible_to(user, [1], [2]).filter(deleted_at__gt=now),
+    }
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot queries of the api and fail if any of them scans a whole table.'
+
+    def handle(self, *args, **options):
+        if connection.vendor not in FULL_SCANS:
+            raise CommandError(f'Query plans of {connection.vendor} can not be checked')
+
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # with next to no rows a sequential scan is always cheapest, make
+                # the planner show whether an index could be used at all
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in get_hot_queries().items():
+                plan = queryset.explain()
+                tables = find_full_scans(plan, connection.vendor)
+                if tables:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'{name}: full scan of {", ".join(tables)}'))
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write(f'{name}: ok')
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries scan whole tables')
+        self.stdout.write(self.style.SUCCESS('No hot query scans a whole table'))
@@ -0,0 +1,182 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from announcement.models import Announcement, Comment
+from assignment.models import Assignment, Submission
+from classroom.models import Classroom
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+FIRST_NAMES = ['Aarav', 'Ada', 'Chen', 'Diego', 'Fatima', 'Hana', 'Ivan', 'Kofi', 'Lena', 'Mei', 'Noah', 'Priya',
+               'Sofia', 'Tariq', 'Yuki', 'Zara']
+LAST_NAMES = ['Garcia', 'Ito', 'Kim', 'Kowalski', 'Mensah', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Smith',
+              'Wang']
+SUBJECTS = ['Biology', 'Chemistry', 'English', 'Geography', 'History', 'Mathematics', 'Music', 'Physics']
+POINTS = [10, 20, 25, 50, 100]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    # bulk_create fills auto_now and auto_now_add fields with the current time,
+    # the generated histories bring timestamps of their own
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def random_moment(start, end):
+    return start + (end - start) * random.random()
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with synthetic classrooms, rosters, assignments, submissions, announcements and '
+            'comments spread over the past --days. Rows are bulk created, so no signals run, the submission '
+            'statuses and counters are set directly.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='synthetic', help='Prefix of the usernames created')
+        parser.add_argument('--classrooms', type=int, default=1000)
+        parser.add_argument('--students', type=int, default=200, help='Roster size of each classroom')
+        parser.add_argument('--classes-per-student', type=int, default=5)
+        parser.add_argument('--classes-per-teacher', type=int, default=4)
+        parser.add_argument('--assignments', type=int, default=100, help='Assignments per classroom')
+        parser.add_argument('--announcements', type=int, default=50, help='Announcements per classroom')
+        parser.add_argument('--comments', type=int, default=5, help='Comments per announcement, on average')
+        parser.add_argument('--turn-in-rate', type=float, default=0.8)
+        parser.add_argument('--grade-rate', type=float, default=0.6)
+        parser.add_argument('--days', type=int, default=180)
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Users prefixed {prefix}_ exist already, pick another --prefix')
+
+        random.seed(options['seed'])
+        self.options = options
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+
+        classrooms = options['classrooms']
+        student_count = max(options['students'], classrooms * options['students'] // options['classes_per_student'])
+        teacher_count = max(1, classrooms // options['classes_per_teacher'])
+        with transaction.atomic():
+            students = User.objects.bulk_create(
+                (self.new_user(f'{prefix}_student_{i}') for i in range(student_count)), batch_size=batch_size)
+            teachers = User.objects.bulk_create(
+                (self.new_user(f'{prefix}_teacher_{i}') for i in range(teacher_count)), batch_size=batch_size)
+
+        totals = {'assignments': 0, 'submissions': 0, 'announcements': 0, 'comments': 0}
+        with explicit_timestamps(Assignment, Submission, Announcement, Comment):
+            for i in range(classrooms):
+                with transaction.atomic():
+                    counts = self.generate_classroom(i, random.choice(teachers), students)
+                for name, count in counts.items():
+                    totals[name] += count
+                if (i + 1) % max(1, classrooms // 10) == 0:
+                    self.stdout.write(f'{i + 1}/{classrooms} classrooms')
+
+        summary = ', '.join(f'{count} {name}' for name, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {student_count} students, {teacher_count} teachers, '
+                                             f'{classrooms} classrooms, {summary}'))
+
+    def new_user(self, username):
+        first_name, last_name = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+        return get_user_model()(username=username, first_name=first_name, last_name=last_name,
+                                email=f'{username}@example.com')
+
+    def generate_classroom(self, index, teacher, students):
+        options = self.options
+        batch_size = options['batch_size']
+        subject = random.choice(SUBJECTS)
+        classroom = Classroom(teacher=teacher, name=f'{subject} {index}', subject=subject,
+                              code=get_random_string(length=Classroom.CODE_LEN))
+        Classroom.objects.bulk_create([classroom])
+
+        roster = random.sample(students, min(options['students'], len(students)))
+        Classroom.students.through.objects.bulk_create(
+            (Classroom.students.through(classroom_id=classroom.id, user_id=student.id) for student in roster),
+            batch_size=batch_size,
+        )
+
+        # counters are part of the assignment rows, the submissions are drawn before either is saved
+        assignments = []
+        drafts = []
+        for i in range(options['assignments']):
+            created_at = random_moment(self.start, self.now)
+            assignment = Assignment(classroom=classroom, title=f'Assignment {i + 1}',
+                                    text=f'Work through part {i + 1} of the {classroom.subject} course.',
+                                    created_at=created_at, edited_at=created_at, points=random.choice(POINTS),
+                                    due_date_time=created_at + timedelta(days=random.randint(1, 14)))
+            submissions = self.draft_submissions(assignment, roster)
+            graded = sum(submission.status == Submission.GRADED for submission in submissions)
+            assignment.submission_count = len(submissions)
+            assignment.graded_count = graded
+            assignment.turned_in_count = len(submissions) - graded
+            assignments.append(assignment)
+            drafts.append(submissions)
+
+        Assignment.objects.bulk_create(assignments, batch_size=batch_size)
+        submissions = []
+        for assignment, assignment_submissions in zip(assignments, drafts):
+            for submission in assignment_submissions:
+                submission.assignment = assignment
+            submissions += assignment_submissions
+        Submission.objects.bulk_create(submissions, batch_size=batch_size)
+
+        announcements = []
+        for i in range(options['announcements']):
+            created_at = random_moment(self.start, self.now)
+            author = teacher if random.random() < 0.7 else random.choice(roster)
+            announcements.append(Announcement(classroom=classroom, author=author, text=f'Announcement {i + 1}',
+                                              created_at=created_at, edited_at=created_at))
+        Announcement.objects.bulk_create(announcements, batch_size=batch_size)
+
+        comments = []
+        for announcement in announcements:
+            for i in range(random.randint(0, 2 * options['comments'])):
+                comments.append(Comment(announcement=announcement, author=random.choice(roster + [teacher]),
+                                        text=f'Comment {i + 1}',
+                                        created_at=random_moment(announcement.created_at, self.now)))
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+
+        return {'assignments': len(assignments), 'submissions': len(submissions),
+                'announcements': len(announcements), 'comments': len(comments)}
+
+    def draft_submissions(self, assignment, roster):
+        submissions = []
+        for student in roster:
+            if random.random() >= self.options['turn_in_rate']:
+                continue
+            # most work is turned in before the due date, some up to three days late
+            created_at = random_moment(assignment.created_at, assignment.due_date_time + timedelta(days=3))
+            if created_at > self.now:
+                continue
+
+            points = None
+            if created_at < self.now - timedelta(days=1) and random.random() < self.options['grade_rate']:
+                points = random.randint(1, assignment.points)
+            if points:
+                status = Submission.GRADED
+            elif created_at <= assignment.due_date_time:
+                status = Submission.DONE
+            else:
+                status = Submission.SUBMITTED_LATE
+            submissions.append(Submission(student=student, url=f'https://example.com/{get_random_string(12)}',
+                                          created_at=created_at, edited_at=created_at, points=points,
+                                          status=status))
+        return submissions
@@ -0,0 +1,44 @@
+# Generated by Django 4.0.2 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+def fill_classroom_codes(apps, schema_editor):
+    # tombstones of classrooms deleted since are never shown again, they keep no code
+    Classroom = apps.get_model('classroom', 'Classroom')
+    Tombstone = apps.get_model('api', 'Tombstone')
+    for classroom_id, code in Classroom.objects.filter(
+            id__in=Tombstone.objects.values('classroom_id')).values_list('id', 'code'):
+        Tombstone.objects.filter(classroom_id=classroom_id).update(classroom_code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0002_alter_classroom_teacher'),
+        ('api', '0022_tombstone'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='tombstone',
+            old_name='student',
+            new_name='user',
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='classroom_code',
+            field=models.CharField(default='', max_length=16),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_classroom_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tombstone',
+            name='model',
+            field=models.CharField(choices=[('announcement', 'announcement'), ('comment', 'comment'), ('assignment', 'assignment'), ('submission', 'submission'), ('classroom', 'classroom'), ('enrollment', 'enrollment')], max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='api_tombsto_user_id_1881b6_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from classroom.models import Classroom
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import Q
+
+
+class TombstoneQuerySet(models.QuerySet):
+    def visible_to(self, user, teaching_ids, enrolled_ids):
+        # students only learn about deletions of their own submissions. Classrooms
+        # that were deleted or that the user left are no longer among theirs, those
+        # tombstones are addressed to the user
+        return self.filter(
+            Q(classroom_id__in=teaching_ids)
+            | Q(classroom_id__in=enrolled_ids) & (~Q(model=Tombstone.SUBMISSION) | Q(user=user))
+            | Q(model__in=[Tombstone.CLASSROOM, Tombstone.ENROLLMENT], user=user)
+        )
+
+
+class Tombstone(models.Model):
+    ANNOUNCEMENT = 'announcement'
+    COMMENT = 'comment'
+    ASSIGNMENT = 'assignment'
+    SUBMISSION = 'submission'
+    # one per member of a deleted classroom, object_id is the classroom's id
+    CLASSROOM = 'classroom'
+    # a student that left or was removed, object_id is the student's id
+    ENROLLMENT = 'enrollment'
+    MODEL_CHOICES = [(ANNOUNCEMENT, ANNOUNCEMENT), (COMMENT, COMMENT), (ASSIGNMENT, ASSIGNMENT),
+                     (SUBMISSION, SUBMISSION), (CLASSROOM, CLASSROOM), (ENROLLMENT, ENROLLMENT)]
+
+    model = models.CharField(max_length=12, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    # no database constraints, a tombstone outlives the classroom and the student it belonged to
+    classroom = models.ForeignKey(Classroom, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    # kept with the tombstone, the classroom may be gone when it is read
+    classroom_code = models.CharField(max_length=Classroom.CODE_LEN)
+    # the student of a submission, the member a classroom or enrollment tombstone is addressed to
+    user = models.ForeignKey(get_user_model(), null=True, on_delete=models.DO_NOTHING, db_constraint=False,
+                             related_name='+')
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TombstoneQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['classroom', 'deleted_at']),
+            models.Index(fields=['deleted_at']),
+            models.Index(fields=['user', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
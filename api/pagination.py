@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    # responses are only paginated when the client asks for it with ?page_size=,
+    # so clients that expect the whole list keep getting it
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('id',)
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'ordering', self.ordering)
@@ -1,11 +1,12 @@
+from classroom.context import get_classroom_context
 from rest_framework.permissions import BasePermission
 
 
 class IsTeacherOrStudentReadOnly(BasePermission):
     def has_object_permission(self, request, view, classroom):
-        user = request.user
+        context = get_classroom_context(request, view.kwargs)
         if request.method == 'GET':
-            return classroom.is_user_part_of_classroom(user)
+            return context.is_member
 
         if request.method == 'DELETE' or request.method == 'PUT':
-            return classroom.is_user_a_teacher(user)
+            return context.is_teacher
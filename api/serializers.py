@@ -1,8 +1,104 @@
-from assignment.serializers import AssignmentWithClassroomSerializer
+from urllib.parse import urlsplit
+
+from announcement.serializers import (AnnouncementSerializer,
+                                      AnnouncementWithCommentCountSerializer,
+                                      CommentSerializer)
+from assignment.models import Submission
+from assignment.serializers import (AssignmentSerializer,
+                                    AssignmentWithClassroomSerializer)
+from classroom.serializers import ClassroomSerializer
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
+from user.serializers import UserSerializer
+
+from .models import Tombstone
 
 
 class ToReviewSerializer(serializers.Serializer):
-    assignment = AssignmentWithClassroomSerializer()
+    assignment = AssignmentWithClassroomSerializer(source='*')
+    turned_in = serializers.IntegerField(min_value=0, source='turned_in_count')
+    graded = serializers.IntegerField(min_value=0, source='graded_count')
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith('/api/'):
+            raise serializers.ValidationError('Path must start with /api/')
+        if path == reverse('batch'):
+            raise serializers.ValidationError('Batches can not be nested')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f'A batch can have at most {settings.BATCH_MAX_REQUESTS} requests')
+        return value
+
+
+class ReviewCountersSerializer(serializers.Serializer):
     turned_in = serializers.IntegerField(min_value=0)
     graded = serializers.IntegerField(min_value=0)
+
+
+class ClassroomDashboardSerializer(serializers.Serializer):
+    classroom = ClassroomSerializer()
+    role = serializers.CharField()
+    announcements = AnnouncementWithCommentCountSerializer(many=True)
+    # link to the next page of the announcements endpoint
+    more_announcements = serializers.URLField(allow_null=True)
+    upcoming_assignments = AssignmentSerializer(many=True)
+    # only for the teacher
+    review = ReviewCountersSerializer(allow_null=True)
+
+
+# the sync serializers read the classroom's code from a classroom_code annotation
+
+
+class SyncAnnouncementSerializer(AnnouncementSerializer):
+    classroom = serializers.CharField(source='classroom_code')
+
+    class Meta(AnnouncementSerializer.Meta):
+        fields = AnnouncementSerializer.Meta.fields + ('classroom',)
+
+
+class SyncCommentSerializer(CommentSerializer):
+    announcement = serializers.IntegerField(source='announcement_id')
+    classroom = serializers.CharField(source='classroom_code')
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ('announcement', 'classroom')
+
+
+class SyncAssignmentSerializer(AssignmentSerializer):
+    classroom = serializers.CharField(source='classroom_code')
+
+    class Meta(AssignmentSerializer.Meta):
+        fields = AssignmentSerializer.Meta.fields + ('classroom',)
+
+
+class SyncSubmissionSerializer(serializers.ModelSerializer):
+    student = UserSerializer(read_only=True)
+    assignment = serializers.IntegerField(source='assignment_id')
+    classroom = serializers.CharField(source='classroom_code')
+
+    class Meta:
+        model = Submission
+        fields = ('id', 'student', 'url', 'created_at', 'edited_at', 'status', 'points', 'assignment', 'classroom')
+
+
+class TombstoneSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='object_id')
+    classroom = serializers.CharField(source='classroom_code')
+
+    class Meta:
+        model = Tombstone
+        fields = ('model', 'id', 'classroom', 'deleted_at')
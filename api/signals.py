@@ -0,0 +1,140 @@
+from announcement.models import Announcement, Comment
+from assignment.models import Assignment, Submission, submissions_graded
+from classroom.models import Classroom
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .deletion import (add_pending_delete, clear_pending_deletes, get_tombstone,
+                       publish_delete, record_cascade)
+from .events import (get_classroom_channel, get_student_channel,
+                     get_teacher_channel, get_user_channel, publish_on_commit)
+from .models import Tombstone
+
+
+def get_action(created):
+    return 'created' if created else 'updated'
+
+
+@receiver(post_save, sender=Announcement)
+def publish_announcement_save(sender, instance, created, **kwargs):
+    event = {'type': f'announcement.{get_action(created)}', 'id': instance.id, 'classroom_id': instance.classroom_id}
+    publish_on_commit(event, get_classroom_channel(instance.classroom_id))
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_save(sender, instance, created, **kwargs):
+    classroom_id = instance.announcement.classroom_id
+    event = {'type': f'comment.{get_action(created)}', 'id': instance.id, 'announcement': instance.announcement_id,
+             'classroom_id': classroom_id}
+    publish_on_commit(event, get_classroom_channel(classroom_id))
+
+
+@receiver(post_save, sender=Assignment)
+def publish_assignment_save(sender, instance, created, **kwargs):
+    event = {'type': f'assignment.{get_action(created)}', 'id': instance.id, 'classroom_id': instance.classroom_id}
+    publish_on_commit(event, get_classroom_channel(instance.classroom_id))
+
+
+def publish_submission_change(instance, classroom_id, created=False):
+    if not created and instance.status == Submission.GRADED:
+        action = 'graded'
+    else:
+        action = get_action(created)
+    event = {'type': f'submission.{action}', 'id': instance.id, 'assignment': instance.assignment_id,
+             'status': instance.status, 'classroom_id': classroom_id}
+    publish_on_commit(event, get_teacher_channel(classroom_id), get_student_channel(classroom_id, instance.student_id))
+
+
+@receiver(post_save, sender=Submission)
+def publish_submission_save(sender, instance, created, **kwargs):
+    publish_submission_change(instance, instance.assignment.classroom_id, created)
+
+
+@receiver(submissions_graded, sender=Submission)
+def publish_submissions_graded(sender, assignment, submissions, **kwargs):
+    for submission in submissions:
+        publish_submission_change(submission, assignment.classroom_id)
+
+
+@receiver(pre_delete, sender=Announcement)
+@receiver(pre_delete, sender=Comment)
+@receiver(pre_delete, sender=Assignment)
+@receiver(pre_delete, sender=Submission)
+def collect_delete(sender, instance, **kwargs):
+    add_pending_delete(instance)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def record_user_delete(sender, instance, using, **kwargs):
+    record_cascade(instance, using)
+
+
+# comments and submissions are deleted before their announcement or assignment
+# when those are deleted, so the classroom can still be looked up
+@receiver(post_delete, sender=Announcement)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_delete, sender=Submission)
+def record_delete(sender, instance, **kwargs):
+    # every pre_delete signal of the delete was sent before
+    clear_pending_deletes()
+    # rows deleted through delete_with_tombstones or with a user are recorded there, all at once
+    if getattr(instance, '_tombstoned', False):
+        return
+
+    if sender is Comment:
+        classroom_id, code = Announcement.objects.filter(id=instance.announcement_id).values_list(
+            'classroom_id', 'classroom__code')[0]
+    elif sender is Submission:
+        classroom_id, code = Assignment.objects.filter(id=instance.assignment_id).values_list(
+            'classroom_id', 'classroom__code')[0]
+    else:
+        classroom_id, code = instance.classroom_id, instance.classroom.code
+    get_tombstone(instance, classroom_id, code).save()
+    publish_delete(instance, classroom_id)
+
+
+@receiver(pre_delete, sender=Classroom)
+def record_classroom_delete(sender, instance, **kwargs):
+    # the members no longer see the classroom in their sync, each gets its tombstone
+    member_ids = [instance.teacher_id, *instance.students.values_list('id', flat=True)]
+    Tombstone.objects.bulk_create(
+        Tombstone(model=Tombstone.CLASSROOM, object_id=instance.id, classroom_id=instance.id,
+                  classroom_code=instance.code, user_id=member_id)
+        for member_id in member_ids
+    )
+    event = {'type': 'classroom.deleted', 'classroom': instance.code}
+    publish_on_commit(event, *(get_user_channel(member_id) for member_id in member_ids))
+
+
+@receiver(m2m_changed, sender=Classroom.students.through)
+def record_enrollment_delete(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_remove' or not pk_set:
+        return
+
+    if reverse:
+        enrollments = [(classroom_id, code, instance.id) for classroom_id, code in
+                       Classroom.objects.filter(id__in=pk_set).values_list('id', 'code')]
+    else:
+        enrollments = [(instance.id, instance.code, student_id) for student_id in pk_set]
+    Tombstone.objects.bulk_create(
+        Tombstone(model=Tombstone.ENROLLMENT, object_id=student_id, classroom_id=classroom_id, classroom_code=code,
+                  user_id=student_id)
+        for classroom_id, code, student_id in enrollments
+    )
+
+
+@receiver(m2m_changed, sender=Classroom.students.through)
+def publish_enrollment_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    event_type = 'classroom.joined' if action == 'post_add' else 'classroom.left'
+    if reverse:
+        # the classrooms were changed from the user's side, instance is the user
+        for code in Classroom.objects.filter(id__in=pk_set).values_list('code', flat=True):
+            publish_on_commit({'type': event_type, 'classroom': code}, get_user_channel(instance.id))
+    else:
+        for user_id in pk_set:
+            publish_on_commit({'type': event_type, 'classroom': instance.code}, get_user_channel(user_id))
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from classroom.models import Classroom
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from oauth2_provider.models import get_access_token_model
+
+from .events import (get_backend, get_classroom_channel, get_student_channel,
+                     get_teacher_channel, get_user_channel)
+
+USER_EVENTS_PATH = '/api/events'
+CLASSROOM_EVENTS_PATH = re.compile(r'^/api/classes/(?P<code>[^/]+)/events$')
+# published on the user's channel, the stream's channels are no longer all theirs
+MEMBERSHIP_END_EVENTS = ('classroom.left', 'classroom.deleted')
+
+
+class StreamError(Exception):
+    def __init__(self, status, detail):
+        self.status = status
+        self.detail = detail
+
+
+def get_token(scope):
+    for name, value in scope['headers']:
+        if name == b'authorization':
+            kind, _, token = value.decode('latin1').partition(' ')
+            if kind.lower() == 'bearer':
+                return token.strip()
+
+    # EventSource can not send headers, browsers pass the token in the query string
+    tokens = parse_qs(scope['query_string'].decode('latin1')).get('access_token')
+    return tokens[0] if tokens else None
+
+
+def get_member_channels(classroom_id, teacher_id, user_id):
+    if teacher_id == user_id:
+        return [get_classroom_channel(classroom_id), get_teacher_channel(classroom_id)]
+    return [get_classroom_channel(classroom_id), get_student_channel(classroom_id, user_id)]
+
+
+def get_stream_channels(token, code):
+    # the channels the token's user may listen to and the codes of their classrooms,
+    # for the classroom with the given code or, without one, for all of the user's classrooms
+    try:
+        access_token = None
+        if token:
+            access_token = get_access_token_model().objects.select_related('user').filter(token=token).first()
+        if access_token is None or not access_token.is_valid() or access_token.user is None:
+            raise StreamError(401, 'Authentication credentials were not provided.')
+        user = access_token.user
+        if not user.is_active:
+            raise StreamError(401, 'User inactive or deleted.')
+
+        if code is None:
+            classrooms = (Classroom.objects.filter(Q(teacher=user) | Q(students=user))
+                          .values_list('id', 'code', 'teacher_id').distinct())
+            # classrooms joined later are only streamed after reconnecting
+        else:
+            classroom = Classroom.objects.filter(code=code).first()
+            if classroom is None:
+                raise StreamError(404, 'Not found.')
+            if classroom.get_user_role(user) is None:
+                raise StreamError(403, 'You do not have permission to perform this action.')
+            classrooms = [(classroom.id, classroom.code, classroom.teacher_id)]
+
+        # a classroom's stream only listens to the user's channel to learn that it ends
+        channels = [get_user_channel(user.id)]
+        codes = {}
+        for classroom_id, classroom_code, teacher_id in classrooms:
+            codes[classroom_id] = classroom_code
+            channels += get_member_channels(classroom_id, teacher_id, user.id)
+        return channels, codes
+    finally:
+        close_old_connections()
+
+
+def is_streamed(event, code):
+    # of the user's own events a classroom's stream only carries the end of its membership
+    if code is None or 'classroom_id' in event:
+        return True
+    return event['type'] in MEMBERSHIP_END_EVENTS and event['classroom'] == code
+
+
+def format_event(event, codes):
+    data = {key: value for key, value in event.items() if key not in ('type', 'classroom_id')}
+    if 'classroom_id' in event:
+        data['classroom'] = codes.get(event['classroom_id'])
+    return f'event: {event["type"]}\ndata: {json.dumps(data)}\n\n'
+
+
+def get_cors_headers(scope):
+    # these responses do not pass through django's middleware
+    for name, value in scope['headers']:
+        if name == b'origin' and value.decode('latin1') in settings.CORS_ALLOWED_ORIGINS:
+            return [(b'access-control-allow-origin', value), (b'vary', b'Origin')]
+    return []
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+class EventStreamRouter:
+    # serves the server-sent event streams and hands every other request to django,
+    # whose 4.0 handler can not stream a response from async code
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            if scope['path'] == USER_EVENTS_PATH:
+                return await self.stream(scope, receive, send, None)
+            match = CLASSROOM_EVENTS_PATH.match(scope['path'])
+            if match:
+                return await self.stream(scope, receive, send, match['code'])
+        return await self.application(scope, receive, send)
+
+    async def stream(self, scope, receive, send, code):
+        token = get_token(scope)
+        try:
+            channels, codes = await sync_to_async(get_stream_channels)(token, code)
+        except StreamError as error:
+            await send({
+                'type': 'http.response.start',
+                'status': error.status,
+                'headers': [(b'content-type', b'application/json'), *get_cors_headers(scope)],
+            })
+            await send({'type': 'http.response.body', 'body': json.dumps({'detail': error.detail}).encode()})
+            return
+
+        backend = get_backend()
+        subscription = backend.subscribe(channels)
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    # keeps nginx style proxies from buffering the stream
+                    (b'x-accel-buffering', b'no'),
+                    *get_cors_headers(scope),
+                ],
+            })
+            await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+
+            loop = asyncio.get_running_loop()
+            checked_at = loop.time()
+            while True:
+                event = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    {event, disconnected},
+                    timeout=settings.EVENTS_HEARTBEAT_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    event.cancel()
+                    return
+
+                if event in done:
+                    event = event.result()
+                    if is_streamed(event, code):
+                        message = format_event(event, codes)
+                        await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+                        if event['type'] in MEMBERSHIP_END_EVENTS:
+                            # the client reconnects to the channels left to it, if any
+                            await send({'type': 'http.response.body'})
+                            return
+                else:
+                    event.cancel()
+                    await send({'type': 'http.response.body', 'body': b': heartbeat\n\n', 'more_body': True})
+
+                # the token may have been revoked and memberships can end without an event,
+                # a stream only lasts as long as it would still be opened
+                if loop.time() - checked_at >= settings.EVENTS_RECHECK_SECONDS:
+                    checked_at = loop.time()
+                    try:
+                        current_channels, _ = await sync_to_async(get_stream_channels)(token, code)
+                    except StreamError:
+                        current_channels = []
+                    if not set(channels) <= set(current_channels):
+                        await send({'type': 'http.response.body'})
+                        return
+        finally:
+            disconnected.cancel()
+            backend.unsubscribe(subscription)
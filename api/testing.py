@@ -0,0 +1,14 @@
+from contextlib import contextmanager
+
+from django.test import override_settings
+
+from .instrumentation import QueryRecorder, recording
+
+# fails the requests, and with them the tests, of views that exceed their query_budget
+enforce_query_budgets = override_settings(QUERY_BUDGET_ENFORCED=True)
+
+
+@contextmanager
+def record_queries():
+    with recording(QueryRecorder()) as recorder:
+        yield recorder
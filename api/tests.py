@@ -1,3 +1,428 @@
-from django.test import TestCase
+import asyncio
+import gzip
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from announcement.models import Announcement, Comment
+from asgiref.sync import sync_to_async
+from assignment.models import Assignment, Submission
+from assignment.views import Submissions
+from classroom.models import Classroom
+from classroom_project.views import render_schema
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from oauth2_provider.models import get_access_token_model
+from rest_framework.test import APIClient
+
+from .instrumentation import QueryBudgetExceeded
+from .management.commands.check_query_plans import find_full_scans, get_hot_queries
+from .models import Tombstone
+from .streams import EventStreamRouter
+from .testing import enforce_query_budgets, record_queries
+from .views import AllToReview
+
+
+class ClassroomTestCase(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.teacher = User.objects.create(username='teacher', email='teacher@example.com')
+        self.students = [User.objects.create(username=f'student{i}', email=f'student{i}@example.com')
+                         for i in range(2)]
+        self.classroom = Classroom.objects.create(teacher=self.teacher, name='Classroom', subject='Subject')
+        self.classroom.students.add(*self.students)
+        self.assignment = Assignment.objects.create(classroom=self.classroom, title='Assignment', text='Text',
+                                                    due_date_time=timezone.now() + timedelta(days=1), points=10)
+        self.submissions = [Submission.objects.create(student=student, assignment=self.assignment,
+                                                      url='https://example.com') for student in self.students]
+        self.announcement = Announcement.objects.create(classroom=self.classroom, author=self.teacher, text='Text')
+        self.comment = Comment.objects.create(announcement=self.announcement, author=self.students[0], text='Text')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def get_tombstones(self):
+        return set(Tombstone.objects.values_list('model', 'object_id', 'classroom_id', 'user_id'))
+
+
+class DeletionTests(ClassroomTestCase):
+    def test_classroom_delete_records_every_member(self):
+        url = reverse('classes_detail', kwargs={'code': self.classroom.code})
+        # one query per table, however many rows cascade
+        with self.assertNumQueries(15):
+            response = self.client.delete(url)
+
+        self.assertEqual(response.status_code, 204)
+        # the rows of the classroom go with it, its members only learn that it is gone
+        classroom_id = self.classroom.id
+        self.assertEqual(self.get_tombstones(), {
+            (Tombstone.CLASSROOM, classroom_id, classroom_id, member.id) for member in [self.teacher, *self.students]})
+
+    def test_assignment_delete_publishes_only_the_assignment(self):
+        url = reverse('assignment_detail', kwargs={'code': self.classroom.code, 'assignment_id': self.assignment.id})
+        with mock.patch('api.deletion.publish_on_commit') as publish:
+            response = self.client.delete(url)
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual([call.args[0]['type'] for call in publish.call_args_list], ['assignment.deleted'])
+        self.assertEqual(Tombstone.objects.filter(model=Tombstone.SUBMISSION).count(), 2)
+
+    def test_submission_delete_updates_the_counters(self):
+        submission = self.submissions[0]
+        submission.points = 5
+        submission.save()
+        submission_id = submission.id
+        submission.delete()
+
+        self.assignment.refresh_from_db()
+        self.assertEqual((self.assignment.turned_in_count, self.assignment.graded_count,
+                          self.assignment.submission_count), (1, 0, 1))
+        self.assertEqual(self.get_tombstones(), {
+            (Tombstone.SUBMISSION, submission_id, self.classroom.id, submission.student_id)})
+
+    def test_user_delete_records_its_cascade(self):
+        student = self.students[0]
+        assignments = [Assignment.objects.create(classroom=self.classroom, title='Assignment', text='Text',
+                                                 due_date_time=timezone.now() + timedelta(days=1), points=10)
+                       for _ in range(10)]
+        submission_ids = [self.submissions[0].id] + [
+            Submission.objects.create(student=student, assignment=assignment, url='https://example.com',
+                                      points=i % 2 or None).id
+            for i, assignment in enumerate(assignments)]
+
+        # as the admin deletes users, with as many queries however many submissions the user had
+        with self.assertNumQueries(32):
+            get_user_model().objects.filter(id=student.id).delete()
+
+        tombstones = {(Tombstone.SUBMISSION, submission_id, self.classroom.id, student.id)
+                      for submission_id in submission_ids}
+        tombstones.add((Tombstone.COMMENT, self.comment.id, self.classroom.id, None))
+        self.assertEqual(self.get_tombstones(), tombstones)
+        self.assertEqual(set(Assignment.objects.values_list('id', 'turned_in_count', 'graded_count',
+                                                           'submission_count')),
+                         {(self.assignment.id, 1, 0, 1), *((assignment.id, 0, 0, 0) for assignment in assignments)})
+
+    def test_users_delete_with_their_classroom(self):
+        get_user_model().objects.filter(id__in=[self.teacher.id, self.students[0].id]).delete()
+
+        classroom_id = self.classroom.id
+        self.assertEqual(self.get_tombstones(), {
+            (Tombstone.CLASSROOM, classroom_id, classroom_id, member.id) for member in [self.teacher, *self.students]})
+
+
+@enforce_query_budgets
+class QueryBudgetTests(ClassroomTestCase):
+    def setUp(self):
+        super().setUp()
+        # enough rows that a query per row would show
+        User = get_user_model()
+        students = [User.objects.create(username=f'other{i}', email=f'other{i}@example.com') for i in range(5)]
+        self.classroom.students.add(*students)
+        for student in students:
+            Submission.objects.create(student=student, assignment=self.assignment, url='https://example.com')
+        for i in range(3):
+            classroom = Classroom.objects.create(teacher=self.teacher, name=f'Classroom {i}', subject='Subject')
+            classroom.students.add(*students)
+            assignment = Assignment.objects.create(classroom=classroom, title='Assignment', text='Text',
+                                                   due_date_time=timezone.now() + timedelta(days=1), points=10)
+            for student in students:
+                Submission.objects.create(student=student, assignment=assignment, url='https://example.com')
+        # the budgets include authenticating the token
+        get_access_token_model().objects.create(
+            user=self.teacher, token='budget', expires=timezone.now() + timedelta(hours=1), scope='read write')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer budget')
+
+    def assertWithinBudget(self, view, url):
+        with record_queries() as recorder:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(recorder.count, view.query_budget)
+        self.assertEqual(recorder.duplicates, {})
+
+    def test_submissions(self):
+        url = reverse('submissions', kwargs={'code': self.classroom.code, 'assignment_id': self.assignment.id})
+        self.assertWithinBudget(Submissions, url)
+
+    def test_all_to_review(self):
+        self.assertWithinBudget(AllToReview, reverse('all_to_review'))
+
+    def test_exceeding_the_budget_fails(self):
+        url = reverse('submissions', kwargs={'code': self.classroom.code, 'assignment_id': self.assignment.id})
+        with mock.patch.object(Submissions, 'query_budget', 1), self.assertRaises(QueryBudgetExceeded):
+            self.client.get(url)
+
+
+class BatchTests(ClassroomTestCase):
+    def setUp(self):
+        super().setUp()
+        get_access_token_model().objects.create(
+            user=self.teacher, token='batch', expires=timezone.now() + timedelta(hours=1), scope='read write')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer batch')
+
+    def post_batch(self, *paths):
+        response = self.client.post(reverse('batch'), {'requests': [{'method': 'GET', 'path': path} for path in paths]},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['responses']
+
+    def test_sub_requests_are_authenticated_as_the_batch(self):
+        responses = self.post_batch(reverse('user_details'), reverse('classes'))
+        self.assertEqual([response['status'] for response in responses], [200, 200])
+        self.assertEqual(responses[0]['body']['id'], self.teacher.id)
+        self.assertEqual([classroom['code'] for classroom in responses[1]['body']], [self.classroom.code])
+
+    def test_exports_are_rejected(self):
+        path = reverse('gradebook_export', kwargs={'code': self.classroom.code, 'export_format': 'csv'})
+        with mock.patch('django.http.StreamingHttpResponse.close') as close:
+            [response] = self.post_batch(path)
+        self.assertEqual(response['status'], 400)
+        close.assert_called_once()
+
+
+@enforce_query_budgets
+class AsyncViewTests(TransactionTestCase):
+    # the worker threads query from connections of their own, the rows have to be committed
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create(username='user', email='user@example.com')
+        other = User.objects.create(username='other', email='other@example.com')
+        for teacher, student in [(self.user, other), (other, self.user), (self.user, None)]:
+            classroom = Classroom.objects.create(teacher=teacher, name='Classroom', subject='Subject')
+            if student is not None:
+                classroom.students.add(student)
+        get_access_token_model().objects.create(
+            user=self.user, token='async', expires=timezone.now() + timedelta(hours=1), scope='read write')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer async')
+
+    def test_same_responses_as_the_sync_views(self):
+        for name in ['classes', 'classes_enrolled', 'all_assignments_to_do', 'all_to_review']:
+            with self.subTest(name):
+                with record_queries() as recorder:
+                    response = self.client.get(reverse(f'async_{name}'))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data, self.client.get(reverse(name)).data)
+                # the queries of the worker threads are counted
+                self.assertEqual(recorder.count, 3 if name == 'classes' else 2)
+
+    def test_paginated(self):
+        response = self.client.get(reverse('async_classes'), {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_authentication(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('async_classes')).status_code, 401)
+
+
+class ConditionalListTests(ClassroomTestCase):
+    def test_delete_advances_last_modified(self):
+        Announcement.objects.create(classroom=self.classroom, author=self.teacher, text='Text')
+        Announcement.objects.update(edited_at=timezone.now() - timedelta(hours=1))
+        url = reverse('announcements', kwargs={'code': self.classroom.code})
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.client.delete(reverse('announcement_detail', kwargs={'code': self.classroom.code,
+                                                                  'announcement_id': self.announcement.id}))
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(last_modified))
+
+
+class SyncTests(ClassroomTestCase):
+    def sync(self, user, since=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse('sync'), {} if since is None else {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_deleted_rows(self):
+        cursor = self.sync(self.students[0])['cursor']
+        comment_id = self.comment.id
+        self.comment.delete()
+        self.submissions[1].delete()
+
+        # students do not learn about the submissions of others
+        deleted = self.sync(self.students[0], cursor - 10 ** 8)['deleted']
+        self.assertEqual([(row['model'], row['id'], row['classroom']) for row in deleted],
+                         [(Tombstone.COMMENT, comment_id, self.classroom.code)])
+
+    def test_deleted_classroom(self):
+        cursor = self.sync(self.students[0])['cursor']
+        code = self.classroom.code
+        self.client.force_authenticate(self.teacher)
+        self.client.delete(reverse('classes_detail', kwargs={'code': code}))
+
+        for member in [self.teacher, *self.students]:
+            data = self.sync(member, cursor - 10 ** 8)
+            self.assertEqual([(row['model'], row['classroom']) for row in data['deleted']],
+                             [(Tombstone.CLASSROOM, code)])
+
+    def test_removed_student(self):
+        cursor = self.sync(self.students[0])['cursor']
+        self.classroom.remove_student(self.students[0])
+
+        deleted = self.sync(self.students[0], cursor - 10 ** 8)['deleted']
+        self.assertEqual([(row['model'], row['id'], row['classroom']) for row in deleted],
+                         [(Tombstone.ENROLLMENT, self.students[0].id, self.classroom.code)])
+        # the teacher drops the student from the roster
+        deleted = self.sync(self.teacher, cursor - 10 ** 8)['deleted']
+        self.assertEqual([(row['model'], row['id']) for row in deleted], [(Tombstone.ENROLLMENT, self.students[0].id)])
+        self.assertEqual(self.sync(self.students[1], cursor - 10 ** 8)['deleted'][0]['model'], Tombstone.ENROLLMENT)
+
+    def test_pages(self):
+        Announcement.objects.bulk_create(
+            Announcement(classroom=self.classroom, author=self.teacher, text=str(i)) for i in range(4))
+        seen = []
+        cursor = None
+        with self.settings(SYNC_PAGE_SIZE=2):
+            while True:
+                data = self.sync(self.teacher, cursor)
+                seen += [row['id'] for row in data['announcements']]
+                cursor = data['cursor']
+                if not data['has_more']:
+                    break
+
+        self.assertCountEqual(seen, Announcement.objects.values_list('id', flat=True))
+
+    def test_rows_sharing_a_timestamp_are_not_split(self):
+        edited_at = timezone.now() - timedelta(minutes=1)
+        Announcement.objects.bulk_create(
+            Announcement(classroom=self.classroom, author=self.teacher, text=str(i)) for i in range(4))
+        Announcement.objects.update(edited_at=edited_at)
+
+        with self.settings(SYNC_PAGE_SIZE=2):
+            data = self.sync(self.teacher)
+        self.assertEqual(len(data['announcements']), 5)
+        self.assertTrue(data['has_more'])
+
+
+class EventStreamTests(TransactionTestCase):
+    # the streams look up their user in another thread, the rows have to be committed
+    def setUp(self):
+        User = get_user_model()
+        self.teacher = User.objects.create(username='teacher', email='teacher@example.com')
+        self.student = User.objects.create(username='student', email='student@example.com')
+        self.classroom = Classroom.objects.create(teacher=self.teacher, name='Classroom', subject='Subject')
+        self.classroom.students.add(self.student)
+        self.token = get_access_token_model().objects.create(
+            user=self.student, token='token', expires=timezone.now() + timedelta(hours=1), scope='read write')
+
+    async def open_stream(self, path):
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+                 'headers': [(b'authorization', b'Bearer token')]}
+        messages = asyncio.Queue()
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        stream = asyncio.ensure_future(EventStreamRouter(None)(scope, receive, messages.put))
+        await messages.get()
+        await messages.get()
+        return stream, messages, disconnected
+
+    async def read_stream(self, stream, messages, disconnected):
+        # the events sent within a second and whether the stream closed by then
+        bodies = []
+        deadline = asyncio.get_running_loop().time() + 1
+        while True:
+            try:
+                message = await asyncio.wait_for(messages.get(), deadline - asyncio.get_running_loop().time())
+            except asyncio.TimeoutError:
+                disconnected.set()
+                await stream
+                return bodies, False
+            if not message.get('more_body'):
+                await stream
+                return bodies, True
+            if not message['body'].startswith(b': heartbeat'):
+                bodies.append(message['body'])
+
+    async def test_removed_student_stream_closes(self):
+        for path in [f'/api/classes/{self.classroom.code}/events', '/api/events']:
+            with self.subTest(path):
+                stream = await self.open_stream(path)
+                await sync_to_async(self.classroom.remove_student)(self.student)
+                bodies, closed = await self.read_stream(*stream)
+                self.assertTrue(closed)
+                self.assertTrue(bodies[0].startswith(b'event: classroom.left'))
+                await sync_to_async(self.classroom.students.add)(self.student)
+
+    async def test_other_classrooms_do_not_close_the_stream(self):
+        other = await sync_to_async(Classroom.objects.create)(teacher=self.teacher, name='Other', subject='Subject')
+        await sync_to_async(other.students.add)(self.student)
+        stream = await self.open_stream(f'/api/classes/{self.classroom.code}/events')
+        await sync_to_async(other.remove_student)(self.student)
+        self.assertEqual(await self.read_stream(*stream), ([], False))
+
+    async def test_revoked_token_stream_closes(self):
+        with self.settings(EVENTS_HEARTBEAT_SECONDS=0.01, EVENTS_RECHECK_SECONDS=0):
+            stream = await self.open_stream('/api/events')
+            await sync_to_async(self.token.delete)()
+            _, closed = await self.read_stream(*stream)
+        self.assertTrue(closed)
+
+
+class FindFullScansTests(SimpleTestCase):
+    def test_sqlite_full_scan(self):
+        plan = 'SCAN assignment_assignment\nSEARCH classroom_classroom USING INTEGER PRIMARY KEY (rowid=?)'
+        self.assertEqual(find_full_scans(plan, 'sqlite'), ['assignment_assignment'])
+
+    def test_sqlite_index_scans(self):
+        plan = ('SCAN assignment_assignment USING INDEX assignment_classroom_idx\n'
+                'SCAN assignment_submission USING COVERING INDEX unique_submission_per_student')
+        self.assertEqual(find_full_scans(plan, 'sqlite'), [])
+
+    def test_postgresql_full_scan(self):
+        plan = 'Seq Scan on assignment_assignment  (cost=0.00..1.01 rows=1 width=8)'
+        self.assertEqual(find_full_scans(plan, 'postgresql'), ['assignment_assignment'])
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        if connection.vendor == 'postgresql':
+            # with next to no rows a sequential scan is always cheapest
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        for name, queryset in get_hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertEqual(find_full_scans(plan, connection.vendor), [], plan)
+
+
+class SchemaTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch('classroom_project.views.load_schema', return_value={'openapi': '3.0.3', 'paths': {}})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        render_schema.cache_clear()
+        self.addCleanup(render_schema.cache_clear)
+
+    def get_schema(self, accept_encoding, etag=None):
+        headers = {'HTTP_ACCEPT_ENCODING': accept_encoding}
+        if etag is not None:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        return self.client.get(reverse('schema'), **headers)
+
+    def test_compressed_schema_has_its_own_etag(self):
+        plain = self.get_schema('identity')
+        compressed = self.get_schema('br, gzip;q=0.5')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+        self.assertNotEqual(plain['ETag'], compressed['ETag'])
+        self.assertEqual(self.get_schema('gzip', compressed['ETag']).status_code, 304)
+        self.assertEqual(self.get_schema('identity', compressed['ETag']).status_code, 200)
+
+    def test_refused_gzip(self):
+        for accept_encoding in ['gzip;q=0', '*;q=0', 'br, *, gzip;q=0.0']:
+            with self.subTest(accept_encoding):
+                self.assertFalse(self.get_schema(accept_encoding).has_header('Content-Encoding'))
@@ -1,6 +1,7 @@
 from django.urls import include, path
+from user.views import UserDetails
 
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('users/', include('user.urls')),
@@ -12,5 +13,23 @@ urlpatterns = [
     path('classes/<str:code>/', include('classroom.urls')),
 
     path('all_assignments_to_do', views.AllAssignmentsToDo.as_view(), name='all_assignments_to_do'),
+    path('all_upcoming_assignments', views.AllUpcomingAssignments.as_view(), name='all_upcoming_assignments'),
     path('all_to_review', views.AllToReview.as_view(), name='all_to_review'),
+    path('gradebook/export.<str:export_format>', views.TeachingGradebookExport.as_view(),
+         name='teaching_gradebook_export'),
+
+    path('sync', views.Sync.as_view(), name='sync'),
+
+    path('batch', views.Batch.as_view(), name='batch'),
+
+    # the dashboard reads with their independent queries run at the same time
+    path('async/classes', async_views.AsyncAllClasses.as_view(), name='async_classes'),
+    path('async/classes_enrolled', async_views.AsyncClassesEnrolled.as_view(), name='async_classes_enrolled'),
+    path('async/all_assignments_to_do', async_views.AsyncAllAssignmentsToDo.as_view(),
+         name='async_all_assignments_to_do'),
+    path('async/all_to_review', async_views.AsyncAllToReview.as_view(), name='async_all_to_review'),
+    # the user comes with authentication, there is no query left to run
+    path('async/users/details', UserDetails.as_view(), name='async_user_details'),
+
+    path('cache_stats', views.ResponseCacheStats.as_view(), name='cache_stats'),
 ]
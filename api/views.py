@@ -1,18 +1,38 @@
+import time
+from datetime import timedelta
+
+from announcement.models import Announcement, Comment
+from assignment.models import Assignment, Submission
 from assignment.serializers import AssignmentWithClassroomSerializer
+from classroom.cache import get_response_cache_stats
+from classroom.gradebook import ExportViewMixin, get_export_response
 from classroom.models import Classroom
 from classroom.serializers import ClassroomSerializer
-from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated
-
-from .serializers import ToReviewSerializer
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import generics, status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .batch import dispatch
+from .helpers import get_cursor, get_since, get_upcoming_filters
+from .models import Tombstone
+from .serializers import (BatchSerializer, SyncAnnouncementSerializer,
+                          SyncAssignmentSerializer, SyncCommentSerializer,
+                          SyncSubmissionSerializer, ToReviewSerializer,
+                          TombstoneSerializer)
 
 
 class ListCreateTeachingClassroom(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ClassroomSerializer
 
+    ordering = ('id',)
+
     def get_queryset(self):
-        return Classroom.objects.filter(teacher=self.request.user)
+        return Classroom.objects.filter(teacher=self.request.user).select_related('teacher').order_by('id')
 
     def perform_create(self, serializer):
         serializer.save(teacher=self.request.user)
@@ -20,51 +40,201 @@ class ListCreateTeachingClassroom(generics.ListCreateAPIView):
 
 class ClassesEnrolled(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 2
     serializer_class = ClassroomSerializer
 
+    ordering = ('id',)
+
     def get_queryset(self):
-        return self.request.user.enrolled_classrooms.all()
+        return self.request.user.enrolled_classrooms.select_related('teacher').order_by('id')
 
 
 class AllClasses(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 2
     serializer_class = ClassroomSerializer
 
+    ordering = ('id',)
+
     def get_queryset(self):
         user = self.request.user
-        classes_enrolled = user.enrolled_classrooms.all()
-        classes_teaching = Classroom.objects.filter(teacher=user)
-        return classes_enrolled.union(classes_teaching)
+        # an OR instead of a union, so that the result can still be filtered by the paginator
+        classes_enrolled = user.enrolled_classrooms.values('id')
+        return (Classroom.objects.filter(Q(teacher=user) | Q(id__in=classes_enrolled))
+                .select_related('teacher')
+                .order_by('id'))
 
 
 class AllAssignmentsToDo(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 2
     serializer_class = AssignmentWithClassroomSerializer
+    ordering = ('due_date_time', 'id')
 
     def get_queryset(self):
-        user = self.request.user
-        all_assignments = []
-        for classroom in user.enrolled_classrooms.all():
-            all_assignments.extend(classroom.get_assignments_todo(user))
+        return (Assignment.objects.todo_for(self.request.user)
+                .select_related('classroom__teacher')
+                .order_by('due_date_time', 'id'))
+
 
-        all_assignments.sort(key=lambda assignement: assignement.due_date_time)
-        return all_assignments
+class AllUpcomingAssignments(generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    query_budget = 2
+    serializer_class = AssignmentWithClassroomSerializer
+    ordering = ('due_date_time', 'id')
+
+    def get_queryset(self):
+        limit, horizon = get_upcoming_filters(self.request.query_params)
+        assignments = (Assignment.objects.filter(classroom__students=self.request.user)
+                       .upcoming(horizon)
+                       .select_related('classroom__teacher'))
+        if limit is not None:
+            return assignments[:limit]
+        return assignments
+
+    def paginate_queryset(self, queryset):
+        # a list cut short with ?limit= can not be paginated any further
+        if self.request.query_params.get('limit'):
+            return None
+        return super().paginate_queryset(queryset)
 
 
 class AllToReview(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 2
     serializer_class = ToReviewSerializer
+    ordering = ('-created_at', 'id')
 
     def get_queryset(self):
-        user = self.request.user
-        data = []
-        for classroom in user.teaching_classrooms.all():
-            assignments = classroom.get_assignments()
-            for assignment in assignments:
-                num_turned_in = len(assignment.get_submissions_to_review())
-                num_graded = len(assignment.get_submissions_graded())
-                total_submissions = len(assignment.get_submissions())
-                if num_graded < total_submissions:
-                    data.append({'assignment': assignment, 'turned_in': num_turned_in, 'graded': num_graded})
-
-        return data
+        return (Assignment.objects
+                .filter(classroom__teacher=self.request.user, graded_count__lt=F('submission_count'))
+                .select_related('classroom__teacher')
+                .order_by('-created_at', 'id'))
+
+
+class TeachingGradebookExport(ExportViewMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, export_format):
+        classrooms = Classroom.objects.filter(teacher=request.user).order_by('id')
+        return get_export_response(classrooms, export_format, 'gradebook')
+
+
+class Sync(APIView):
+    permission_classes = [IsAuthenticated]
+    query_budget = 6
+    # rows saved by transactions still open when the cursor is taken carry an
+    # earlier timestamp, the cursor lags behind so that the next sync sees them
+    cursor_lag = timedelta(seconds=5)
+
+    def get(self, request):
+        user = request.user
+        now = timezone.now()
+
+        since = get_since(request.query_params)
+        if since is not None and since < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+            return Response({'detail': 'Deletions since this cursor are no longer known, sync without since'},
+                            status=status.HTTP_410_GONE)
+
+        classrooms = (Classroom.objects.filter(Q(teacher=user) | Q(students=user))
+                      .values_list('id', 'teacher_id').distinct())
+        teaching_ids = []
+        enrolled_ids = []
+        for classroom_id, teacher_id in classrooms:
+            if teacher_id == user.id:
+                teaching_ids.append(classroom_id)
+            else:
+                enrolled_ids.append(classroom_id)
+        classroom_ids = teaching_ids + enrolled_ids
+
+        announcements = Announcement.objects.filter(classroom_id__in=classroom_ids)
+        comments = Comment.objects.filter(announcement__classroom_id__in=classroom_ids)
+        assignments = Assignment.objects.filter(classroom_id__in=classroom_ids)
+        # students only see their own submissions
+        submissions = Submission.objects.filter(
+            Q(assignment__classroom_id__in=teaching_ids) | Q(assignment__classroom_id__in=enrolled_ids, student=user)
+        )
+        tombstones = Tombstone.objects.none()
+
+        if since is not None:
+            announcements = announcements.filter(edited_at__gt=since)
+            comments = comments.filter(created_at__gt=since)
+            assignments = assignments.filter(edited_at__gt=since)
+            submissions = submissions.filter(edited_at__gt=since)
+            tombstones = Tombstone.objects.visible_to(user, teaching_ids, enrolled_ids).filter(deleted_at__gt=since)
+
+        announcements = (announcements.select_related('author')
+                         .annotate(classroom_code=F('classroom__code')).order_by('edited_at', 'id'))
+        comments = (comments.select_related('author')
+                    .annotate(classroom_code=F('announcement__classroom__code')).order_by('created_at', 'id'))
+        assignments = assignments.annotate(classroom_code=F('classroom__code')).order_by('edited_at', 'id')
+        submissions = (submissions.select_related('student')
+                       .annotate(classroom_code=F('assignment__classroom__code')).order_by('edited_at', 'id'))
+        tombstones = tombstones.order_by('deleted_at', 'id')
+
+        collections = [
+            ('announcements', announcements, 'edited_at', SyncAnnouncementSerializer),
+            ('comments', comments, 'created_at', SyncCommentSerializer),
+            ('assignments', assignments, 'edited_at', SyncAssignmentSerializer),
+            ('submissions', submissions, 'edited_at', SyncSubmissionSerializer),
+            ('deleted', tombstones, 'deleted_at', TombstoneSerializer),
+        ]
+        pages, cursor, has_more = self.get_pages(collections, now - self.cursor_lag)
+
+        data = {'cursor': get_cursor(cursor), 'has_more': has_more}
+        for name, _, _, serializer_class in collections:
+            data[name] = serializer_class(pages[name], many=True).data
+        return Response(data)
+
+    def get_pages(self, collections, cursor):
+        # every collection is cut at SYNC_PAGE_SIZE rows. When one is cut, all of them
+        # stop short of the first timestamp left out and the cursor resumes from there,
+        # without lagging behind: the cursor of the last page does
+        limit = settings.SYNC_PAGE_SIZE
+        pages = {name: list(queryset[:limit + 1]) for name, queryset, _, _ in collections}
+        cut_offs = {name: getattr(pages[name][limit], field)
+                    for name, _, field, _ in collections if len(pages[name]) > limit}
+        if not cut_offs:
+            return pages, cursor, False
+
+        cut_off = min(cut_offs.values())
+        kept = {name: [row for row in pages[name][:limit] if getattr(row, field) < cut_off]
+                for name, _, field, _ in collections}
+        if any(kept.values()):
+            return kept, cut_off - timedelta(microseconds=1), True
+
+        # more rows than a page share the earliest timestamp, they are sent all at once
+        ties = {}
+        for name, queryset, field, _ in collections:
+            if cut_offs.get(name) == cut_off:
+                ties[name] = list(queryset.filter(**{field: cut_off}))
+            else:
+                ties[name] = [row for row in pages[name][:limit] if getattr(row, field) == cut_off]
+        return ties, cut_off, True
+
+
+class Batch(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # sub-requests run one after another, a failing one does not undo those before it
+        deadline = time.monotonic() + settings.BATCH_TIME_BUDGET_SECONDS
+        responses = []
+        for sub_request in serializer.validated_data['requests']:
+            if time.monotonic() > deadline:
+                responses.append({'status': status.HTTP_503_SERVICE_UNAVAILABLE,
+                                  'body': {'detail': 'The time budget of the batch ran out.'}})
+                continue
+            responses.append(dispatch(request, sub_request['method'], sub_request['path'], sub_request.get('body')))
+
+        return Response({'responses': responses})
+
+
+class ResponseCacheStats(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_response_cache_stats())
@@ -1,25 +1,26 @@
 from datetime import datetime, timezone
 
-
-def get_submission_data(due_date_time, student, submission):
-    if submission is not None:
-        status = submission.status
-
-    elif due_date_time > datetime.now(timezone.utc):
-        status = 'Assigned'
-    else:
-        status = 'Missing'
-
-    return {'student': student, 'submission': submission, 'status': status}
-
-
-def get_student_submission_data(assignment, student, submission):
-    if submission is not None:
-        status = submission.status
-
-    elif assignment.due_date_time > datetime.now(timezone.utc):
-        status = 'Assigned'
-    else:
-        status = 'Missing'
-
-    return {'student': student, 'submission': submission, 'assignment': assignment, 'status': status}
+from django.db.models import Case, CharField, F, Value, When
+from django.db.models.functions import Coalesce
+
+ASSIGNED = 'Assigned'
+MISSING = 'Missing'
+
+
+def get_status_expression(submission_status, due_date_time):
+    # status of a possibly missing submission, computed by the database from
+    # the paths of the submission's stored status and the assignment's due date
+    return Coalesce(
+        F(submission_status),
+        Case(
+            When(**{f'{due_date_time}__gt': datetime.now(timezone.utc)}, then=Value(ASSIGNED)),
+            default=Value(MISSING),
+        ),
+        output_field=CharField(),
+    )
+
+
+def get_unsubmitted_status(due_date_time):
+    if due_date_time > datetime.now(timezone.utc):
+        return ASSIGNED
+    return MISSING
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
+
+from assignment.models import Assignment, Submission
+
+GRADED = Q(submission__status=Submission.GRADED)
+COUNTER_FIELDS = ('turned_in_count', 'graded_count', 'submission_count')
+
+
+class Command(BaseCommand):
+    help = "Recount every assignment's turned in, graded and total submissions from the submissions table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report assignments whose counters are wrong, exit with an error if any are.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        assignments = Assignment.objects.annotate(
+            actual_total=Count('submission'),
+            actual_graded=Count('submission', filter=GRADED),
+        ).only('id', *COUNTER_FIELDS).order_by('id')
+
+        with transaction.atomic():
+            stale = []
+            for assignment in assignments.iterator(chunk_size=options['batch_size']):
+                actual = {
+                    'turned_in_count': assignment.actual_total - assignment.actual_graded,
+                    'graded_count': assignment.actual_graded,
+                    'submission_count': assignment.actual_total,
+                }
+                if all(getattr(assignment, field) == value for field, value in actual.items()):
+                    continue
+
+                if options['verify']:
+                    self.stdout.write(f'Assignment {assignment.id}: stored '
+                                      f'{[getattr(assignment, field) for field in COUNTER_FIELDS]}, '
+                                      f'actual {[actual[field] for field in COUNTER_FIELDS]}')
+                for field, value in actual.items():
+                    setattr(assignment, field, value)
+                stale.append(assignment)
+
+            if options['verify']:
+                if stale:
+                    raise CommandError(f'{len(stale)} assignment(s) have wrong submission counters')
+                self.stdout.write(self.style.SUCCESS('All submission counters are correct'))
+                return
+
+            Assignment.objects.bulk_update(stale, COUNTER_FIELDS, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt submission counters of {len(stale)} assignment(s)'))
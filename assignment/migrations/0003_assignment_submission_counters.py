@@ -0,0 +1,41 @@
+# Generated by Django 4.0.2 on 2026-10-18 18:49
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_submissions(apps, schema_editor):
+    Assignment = apps.get_model('assignment', 'Assignment')
+    graded = Q(submission__points__isnull=False) & ~Q(submission__points=0)
+    assignments = Assignment.objects.annotate(total=Count('submission'), graded=Count('submission', filter=graded))
+    for assignment in assignments:
+        assignment.turned_in_count = assignment.total - assignment.graded
+        assignment.graded_count = assignment.graded
+        assignment.submission_count = assignment.total
+        assignment.save(update_fields=['turned_in_count', 'graded_count', 'submission_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0002_alter_assignment_classroom'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='graded_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='submission_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='turned_in_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_submissions, migrations.RunPython.noop),
+    ]
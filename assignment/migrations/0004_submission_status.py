@@ -0,0 +1,38 @@
+# Generated by Django 4.0.2 on 2026-10-18 18:50
+
+from django.db import migrations, models
+from django.db.models import Case, OuterRef, Q, Subquery, Value, When
+
+
+def set_statuses(apps, schema_editor):
+    Assignment = apps.get_model('assignment', 'Assignment')
+    Submission = apps.get_model('assignment', 'Submission')
+
+    due_date_time = Subquery(Assignment.objects.filter(id=OuterRef('assignment_id')).values('due_date_time'))
+    graded = Q(points__isnull=False) & ~Q(points=0)
+    Submission.objects.filter(graded).update(status='Graded')
+    Submission.objects.exclude(graded).update(status=Case(
+        When(created_at__lte=due_date_time, then=Value('Done')),
+        default=Value('Submitted Late'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0003_assignment_submission_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='status',
+            field=models.CharField(choices=[('Done', 'Done'), ('Submitted Late', 'Submitted Late'), ('Graded', 'Graded')], default='Done', max_length=14),
+            preserve_default=False,
+        ),
+        migrations.RunPython(set_statuses, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assignment', 'status'], name='assignment__assignm_1b5fee_idx'),
+        ),
+    ]
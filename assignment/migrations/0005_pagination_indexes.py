@@ -0,0 +1,17 @@
+# Generated by Django 4.0.2 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0004_submission_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['classroom', 'created_at'], name='assignment__classro_564b4e_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.0.2 on 2026-10-18 18:54
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Q
+
+
+def remove_duplicate_submissions(apps, schema_editor):
+    # keep each student's first submission for an assignment, which is the one
+    # the api has always shown, and recount the assignments that had duplicates
+    Assignment = apps.get_model('assignment', 'Assignment')
+    Submission = apps.get_model('assignment', 'Submission')
+
+    duplicates = (Submission.objects.values('assignment_id', 'student_id')
+                  .annotate(first_id=Min('id'), total=Count('id'))
+                  .filter(total__gt=1))
+    assignment_ids = set()
+    for duplicate in duplicates:
+        Submission.objects.filter(
+            assignment_id=duplicate['assignment_id'],
+            student_id=duplicate['student_id'],
+        ).exclude(id=duplicate['first_id']).delete()
+        assignment_ids.add(duplicate['assignment_id'])
+
+    assignments = Assignment.objects.filter(id__in=assignment_ids).annotate(
+        total=Count('submission'),
+        graded=Count('submission', filter=Q(submission__status='Graded')),
+    )
+    for assignment in assignments:
+        assignment.turned_in_count = assignment.total - assignment.graded
+        assignment.graded_count = assignment.graded
+        assignment.submission_count = assignment.total
+        assignment.save(update_fields=['turned_in_count', 'graded_count', 'submission_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0005_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['classroom', 'due_date_time'], name='assignment__classro_561862_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_submissions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='submission',
+            constraint=models.UniqueConstraint(fields=('assignment', 'student'), name='unique_submission_per_student'),
+        ),
+    ]
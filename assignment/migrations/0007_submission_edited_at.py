@@ -0,0 +1,33 @@
+# Generated by Django 4.0.2 on 2026-10-18 19:00
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_edited_at(apps, schema_editor):
+    Submission = apps.get_model('assignment', 'Submission')
+    Submission.objects.update(edited_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignment', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='edited_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(set_edited_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['classroom', 'edited_at'], name='assignment__classro_04e4e7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['edited_at'], name='assignment__edited__49b2ef_idx'),
+        ),
+    ]
@@ -1,8 +1,38 @@
 from classroom.models import Classroom
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Case, Exists, F, FilteredRelation, OuterRef, Q,
+                              Value, When)
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
 
-from .helpers import get_submission_data
+from .helpers import get_unsubmitted_status
+
+# sent by Assignment.grade_submissions, whose bulk_update skips the submissions' post_save
+submissions_graded = Signal()
+
+
+class AssignmentQuerySet(models.QuerySet):
+    def not_submitted_by(self, student):
+        submissions = Submission.objects.filter(assignment=OuterRef('pk'), student=student)
+        return self.filter(~Exists(submissions))
+
+    def todo_for(self, student):
+        return self.filter(classroom__students=student).not_submitted_by(student)
+
+    def upcoming(self, horizon=None):
+        now = timezone.now()
+        assignments = self.filter(due_date_time__gt=now)
+        if horizon is not None:
+            assignments = assignments.filter(due_date_time__lte=now + horizon)
+        return assignments.order_by('due_date_time', 'id')
+
+    def update_submission_counters(self, turned_in=0, graded=0, total=0):
+        deltas = {'turned_in_count': turned_in, 'graded_count': graded, 'submission_count': total}
+        changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if changes:
+            self.update(**changes)
 
 
 class Assignment(models.Model):
@@ -13,52 +43,153 @@ class Assignment(models.Model):
     edited_at = models.DateTimeField(auto_now=True)
     due_date_time = models.DateTimeField()
     points = models.PositiveSmallIntegerField()
+    # maintained by Submission.save and the post_delete handler in signals.py,
+    # rebuild with `manage.py rebuild_submission_counters`
+    turned_in_count = models.IntegerField(default=0)
+    graded_count = models.IntegerField(default=0)
+    submission_count = models.IntegerField(default=0)
+
+    objects = AssignmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['classroom', 'created_at']),
+            models.Index(fields=['classroom', 'due_date_time']),
+            models.Index(fields=['classroom', 'edited_at']),
+        ]
 
     def get_submissions(self):
         return [submission for submission in self.submission_set.all()]
 
-    def get_all_submissions(self):
-        submissions = []
-        for student in self.classroom.students.all():
-            submission = self.get_student_submission(student)
-            data = get_submission_data(self.due_date_time, student, submission)
-            submissions.append(data)
+    def get_all_submissions(self, status=None):
+        # the roster left joined with this assignment's submissions, each student
+        # row carries its submission's columns and status as annotations
+        students = get_user_model().objects.filter(enrolled_classrooms=self.classroom_id).annotate(
+            assignment_submission=FilteredRelation('submission', condition=Q(submission__assignment=self)),
+        ).annotate(
+            submission_id=F('assignment_submission__id'),
+            submission_url=F('assignment_submission__url'),
+            submission_created_at=F('assignment_submission__created_at'),
+            submission_points=F('assignment_submission__points'),
+            submission_status=F('assignment_submission__status'),
+            status=Coalesce('assignment_submission__status', Value(get_unsubmitted_status(self.due_date_time))),
+        ).order_by('id')
 
-        return submissions
+        if status is not None:
+            students = students.filter(status=status)
+        return students
 
     def get_submissions_to_review(self):
-        return [submission for submission in self.submission_set.all()
-                if submission.status == 'Done' or submission.status == 'Submitted Late']
+        return self.submission_set.filter(status__in=[Submission.DONE, Submission.SUBMITTED_LATE])
 
     def get_submissions_graded(self):
-        return [submission for submission in self.submission_set.all()
-                if submission.status == 'Graded']
+        return self.submission_set.filter(status=Submission.GRADED)
+
+    def update_submission_statuses(self):
+        # only whether a submission is late depends on the due date, graded ones keep their status
+        self.submission_set.exclude(status=Submission.GRADED).update(status=Case(
+            When(created_at__lte=self.due_date_time, then=Value(Submission.DONE)),
+            default=Value(Submission.SUBMITTED_LATE),
+        ), edited_at=timezone.now())
+
+    def grade_submissions(self, grades):
+        # grades are (submission, points) pairs of this assignment's submissions, the
+        # statuses and counters that Submission.save would maintain are set here
+        now = timezone.now()
+        submissions = []
+        graded = 0
+        for submission, points in grades:
+            was_graded = submission.is_graded
+            submission.assignment = self
+            submission.points = points
+            submission.status = submission.get_status()
+            submission.edited_at = now
+            graded += submission.is_graded - was_graded
+            submissions.append(submission)
+
+        with transaction.atomic():
+            Submission.objects.bulk_update(submissions, ['points', 'status', 'edited_at'])
+            Assignment.objects.filter(id=self.id).update_submission_counters(turned_in=-graded, graded=graded)
+        submissions_graded.send(sender=Submission, assignment=self, submissions=submissions)
+        return submissions
 
     def get_student_submission(self, user):
-        for submission in self.submission_set.all():
-            if submission.student == user:
-                return submission
-        return None
+        return self.submission_set.filter(student=user).first()
 
     def __str__(self):
         return f'{self.title} -  {self.text}'
 
 
 class Submission(models.Model):
+    DONE = 'Done'
+    SUBMITTED_LATE = 'Submitted Late'
+    GRADED = 'Graded'
+    STATUS_CHOICES = [(DONE, DONE), (SUBMITTED_LATE, SUBMITTED_LATE), (GRADED, GRADED)]
+
     student = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
     url = models.URLField(max_length=500)
     created_at = models.DateTimeField(auto_now_add=True)
+    edited_at = models.DateTimeField(auto_now=True)
     points = models.FloatField(null=True, blank=True)
+    # kept in sync by save and Assignment.update_submission_statuses
+    status = models.CharField(max_length=14, choices=STATUS_CHOICES)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assignment', 'status']),
+            models.Index(fields=['edited_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['assignment', 'student'], name='unique_submission_per_student'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.status = self.get_status()
+        with transaction.atomic():
+            # the stored points are read under a row lock, concurrent saves of the same
+            # submission would otherwise both move it between the assignment's counters
+            was_graded = None
+            if self.id is not None:
+                stored_points = Submission.objects.select_for_update().filter(id=self.id).values_list(
+                    'points', flat=True)
+                was_graded = bool(stored_points[0]) if stored_points else None
+            super().save(*args, **kwargs)
+
+            if was_graded is None:
+                counters = {'total': 1, **self.get_counter_deltas(self.is_graded, 1)}
+            elif was_graded != self.is_graded:
+                counters = {**self.get_counter_deltas(was_graded, -1), **self.get_counter_deltas(self.is_graded, 1)}
+            else:
+                counters = {}
+            Assignment.objects.filter(id=self.assignment_id).update_submission_counters(**counters)
+
+    @staticmethod
+    def from_annotations(row, **related):
+        if row.submission_id is None:
+            return None
+        return Submission(id=row.submission_id, url=row.submission_url, created_at=row.submission_created_at,
+                          points=row.submission_points, status=row.submission_status, **related)
+
+    @staticmethod
+    def get_counter_deltas(is_graded, delta):
+        if is_graded:
+            return {'graded': delta}
+        return {'turned_in': delta}
 
     @property
-    def status(self):
-        if self.points:
-            return 'Graded'
+    def is_graded(self):
+        return bool(self.points)
+
+    def get_status(self):
+        if self.is_graded:
+            return self.GRADED
 
-        if self.created_at <= self.assignment.due_date_time:
-            return 'Done'
-        return 'Submitted Late'
+        # created_at is only filled in by the first save
+        created_at = self.created_at or timezone.now()
+        if created_at <= self.assignment.due_date_time:
+            return self.DONE
+        return self.SUBMITTED_LATE
 
     def __str__(self):
         return f'{self.url}'
@@ -1,73 +1,60 @@
-from classroom.models import Classroom
-from django.shortcuts import get_object_or_404
+from classroom.context import get_classroom_context
 from rest_framework.permissions import BasePermission
 
-from assignment.models import Assignment, Submission
-
 
 class IsTeacherOrStudentReadOnly(BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        classroom = get_object_or_404(Classroom, code=view.kwargs['code'])
+        context = get_classroom_context(request, view.kwargs)
 
         if request.method == 'GET':
-            return classroom.is_user_part_of_classroom(user)
+            return context.is_member
 
         if request.method == 'POST' or request.method == 'DELETE' or request.method == 'PUT':
-            return classroom.is_user_a_teacher(user)
+            return context.is_teacher
 
 
 class IsAssignmentPartOfClassroom(BasePermission):
     def has_permission(self, request, view):
-        code = view.kwargs['code']
-        assignment_id = view.kwargs['assignment_id']
-        classroom = get_object_or_404(Classroom, code=code)
-        assignment = get_object_or_404(Assignment, id=assignment_id)
+        context = get_classroom_context(request, view.kwargs)
+        assignment = context.get_assignment(view.kwargs['assignment_id'])
 
-        return assignment.classroom == classroom
+        return assignment.classroom_id == context.classroom.id
 
 
 class IsSubmissionPartOfAssignment(BasePermission):
     def has_permission(self, request, view):
-        submission_id = view.kwargs['submission_id']
-        assignment_id = view.kwargs['assignment_id']
-        assignment = get_object_or_404(Assignment, id=assignment_id)
-        submission = get_object_or_404(Submission, id=submission_id)
+        context = get_classroom_context(request, view.kwargs)
+        assignment = context.get_assignment(view.kwargs['assignment_id'])
+        submission = context.get_submission(view.kwargs['submission_id'])
 
-        return submission.assignment == assignment
+        return submission.assignment_id == assignment.id
 
 
 class IsTeacherOrStudentReadOnlyAssignmentDetail(BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        code = view.kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        context = get_classroom_context(request, view.kwargs)
 
         if request.method == 'GET':
-            return classroom.is_user_part_of_classroom(user)
+            return context.is_member
 
         if request.method == 'DELETE' or request.method == 'PUT':
-            return classroom.is_user_a_teacher(user)
+            return context.is_teacher
 
 
 class IsTeacherOrStudentPostOnlySubmissions(BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        code = view.kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        context = get_classroom_context(request, view.kwargs)
 
         if request.method == 'GET' or request.method == 'PATCH':
-            return classroom.is_user_a_teacher(user)
+            return context.is_teacher
 
         if request.method == 'POST':
-            return classroom.is_user_a_student(user)
+            return context.is_student
 
 
 class IsStudentReadOnly(BasePermission):
     def has_permission(self, request, view):
-        user = request.user
-        code = view.kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        context = get_classroom_context(request, view.kwargs)
 
         if request.method == 'GET':
-            return classroom.is_user_a_student(user)
+            return context.is_student
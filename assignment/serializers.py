@@ -1,6 +1,8 @@
+from collections import Counter
 from datetime import datetime, timezone
 
 from classroom.serializers import ClassroomSerializer
+from django.conf import settings
 from rest_framework import serializers
 from user.serializers import UserSerializer
 
@@ -56,6 +58,54 @@ class SubmissionSerializer(serializers.ModelSerializer):
         return value
 
 
+def get_submission_id(grade):
+    try:
+        return serializers.IntegerField().to_internal_value(grade['submission_id'])
+    except (KeyError, TypeError, serializers.ValidationError):
+        return None
+
+
+class GradeSerializer(serializers.Serializer):
+    submission_id = serializers.IntegerField()
+    points = serializers.FloatField(min_value=0)
+
+    def validate_submission_id(self, value):
+        if value not in self.context['submissions']:
+            raise serializers.ValidationError('Submission is not part of the assignment')
+        if self.context['submission_ids'][value] > 1:
+            raise serializers.ValidationError('Submission is graded more than once')
+        return value
+
+    def validate_points(self, value):
+        if value > self.context['assignment'].points:
+            raise serializers.ValidationError("Submission's points must be less than or equal to assignment's points")
+        return value
+
+
+class BulkGradeSerializer(serializers.Serializer):
+    grades = GradeSerializer(many=True, allow_empty=False)
+
+    def to_internal_value(self, data):
+        # the submissions named by the grades are loaded with one query before any
+        # grade is validated, so that every grade is checked against them in one pass
+        grades = data.get('grades') if hasattr(data, 'get') else None
+        if not isinstance(grades, list):
+            return super().to_internal_value(data)
+        if len(grades) > settings.BULK_GRADE_MAX_SUBMISSIONS:
+            raise serializers.ValidationError({'grades': [
+                f'At most {settings.BULK_GRADE_MAX_SUBMISSIONS} submissions can be graded at once']})
+
+        ids = [submission_id for submission_id in map(get_submission_id, grades) if submission_id is not None]
+        self.context['submission_ids'] = Counter(ids)
+        # locked until the grades are saved, so that a concurrent grading can not leave the counters off
+        self.context['submissions'] = self.context['assignment'].submission_set.select_for_update(
+            of=('self',)).select_related('student').in_bulk(ids)
+        return super().to_internal_value(data)
+
+    def validate_grades(self, value):
+        return [(self.context['submissions'][grade['submission_id']], grade['points']) for grade in value]
+
+
 class NewSubmissionSerializer(serializers.ModelSerializer):
     student = UserSerializer(read_only=True)
     assignment = AssignmentSerializer(read_only=True)
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Assignment, Submission
+
+
+@receiver(post_delete, sender=Submission)
+def update_counters_on_submission_delete(sender, instance, **kwargs):
+    # api.deletion.record_deletes adjusts the counters of the rows it marks itself
+    if getattr(instance, '_tombstoned', False):
+        return
+    counters = {'total': -1, **Submission.get_counter_deltas(instance.is_graded, -1)}
+    Assignment.objects.filter(id=instance.assignment_id).update_submission_counters(**counters)
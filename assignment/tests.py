@@ -1,3 +1,144 @@
+from datetime import timedelta
+
+from classroom.models import Classroom
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Assignment, Submission
+
+
+class BulkGradeTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.teacher = User.objects.create(username='teacher', email='teacher@example.com')
+        self.students = [User.objects.create(username=f'student{i}', email=f'student{i}@example.com')
+                         for i in range(3)]
+        self.classroom = Classroom.objects.create(teacher=self.teacher, name='Classroom', subject='Subject')
+        self.classroom.students.add(*self.students)
+        self.assignment = Assignment.objects.create(classroom=self.classroom, title='Assignment', text='Text',
+                                                    due_date_time=timezone.now() + timedelta(days=1), points=10)
+        self.submissions = [Submission.objects.create(student=student, assignment=self.assignment,
+                                                      url='https://example.com') for student in self.students]
+        self.url = reverse('bulk_grade_submissions',
+                           kwargs={'code': self.classroom.code, 'assignment_id': self.assignment.id})
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_grades_submissions(self):
+        first, second, _ = self.submissions
+        response = self.client.post(self.url, {'grades': [{'submission_id': first.id, 'points': 7},
+                                                          {'submission_id': second.id, 'points': 10}]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([submission['points'] for submission in response.data], [7, 10])
+        first.refresh_from_db()
+        self.assertEqual((first.points, first.status), (7, Submission.GRADED))
+        self.assignment.refresh_from_db()
+        self.assertEqual((self.assignment.turned_in_count, self.assignment.graded_count,
+                          self.assignment.submission_count), (1, 2, 3))
+
+    def test_reports_every_invalid_grade(self):
+        first, second, _ = self.submissions
+        other = Assignment.objects.create(classroom=self.classroom, title='Other', text='Text',
+                                          due_date_time=timezone.now(), points=10)
+        foreign = Submission.objects.create(student=self.students[0], assignment=other, url='https://example.com')
+        response = self.client.post(self.url, {'grades': [
+            {'submission_id': first.id, 'points': 50},
+            {'submission_id': 999999, 'points': 1},
+            {'submission_id': foreign.id, 'points': 1},
+            {'submission_id': second.id, 'points': 1},
+            {'submission_id': second.id, 'points': 2},
+            {'submission_id': self.submissions[2].id, 'points': 1},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['grades']
+        self.assertEqual(list(errors[0]), ['points'])
+        self.assertEqual(list(errors[1]), ['submission_id'])
+        self.assertEqual(list(errors[2]), ['submission_id'])
+        self.assertEqual(list(errors[3]), ['submission_id'])
+        self.assertEqual(list(errors[4]), ['submission_id'])
+        self.assertEqual(errors[5], {})
+        self.assertFalse(Submission.objects.filter(points__isnull=False).exists())
+
+    def test_only_the_teacher_grades(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.client.post(self.url, {'grades': [{'submission_id': self.submissions[0].id, 'points': 1}]},
+                                    format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class AssignmentListTests(TestCase):
+    def setUp(self):
+        teacher = get_user_model().objects.create(username='teacher', email='teacher@example.com')
+        self.classroom = Classroom.objects.create(teacher=teacher, name='Classroom', subject='Subject')
+        for days in range(1, 4):
+            Assignment.objects.create(classroom=self.classroom, title='Assignment', text='Text',
+                                      due_date_time=timezone.now() + timedelta(days=days), points=10)
+        self.client = APIClient()
+        self.client.force_authenticate(teacher)
+
+    def get_assignments(self, **params):
+        response = self.client.get(reverse('assignments', kwargs={'code': self.classroom.code}), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_limit_caps_only_upcoming_lists(self):
+        self.assertEqual(len(self.get_assignments(upcoming=1, limit=2, page_size=1)), 2)
+        # ?limit= means nothing to the other lists, which are still paginated
+        page = self.get_assignments(limit=2, page_size=1)
+        self.assertEqual(len(page['results']), 1)
+        self.assertIsNotNone(page['next'])
+
+
+class SubmissionCounterTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.teacher = User.objects.create(username='teacher')
+        self.student = User.objects.create(username='student')
+        classroom = Classroom.objects.create(teacher=self.teacher, name='Classroom', subject='Subject')
+        self.assignment = Assignment.objects.create(classroom=classroom, title='Assignment', text='Text',
+                                                    due_date_time=timezone.now() + timedelta(days=1), points=10)
+
+    def assertCounters(self, turned_in, graded, total):
+        self.assignment.refresh_from_db()
+        self.assertEqual((self.assignment.turned_in_count, self.assignment.graded_count,
+                          self.assignment.submission_count), (turned_in, graded, total))
+
+    def test_counters_follow_the_submission(self):
+        submission = Submission.objects.create(student=self.student, assignment=self.assignment,
+                                               url='https://example.com')
+        self.assertCounters(1, 0, 1)
+        submission.points = 5
+        submission.save()
+        self.assertCounters(0, 1, 1)
+        submission.points = None
+        submission.save()
+        self.assertCounters(1, 0, 1)
+        submission.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_stale_instances_grade_once(self):
+        Submission.objects.create(student=self.student, assignment=self.assignment, url='https://example.com')
+        # two requests that loaded the submission before either graded it
+        first, second = Submission.objects.get(), Submission.objects.get()
+        first.points = 5
+        first.save()
+        second.points = 6
+        second.save()
+        self.assertCounters(0, 1, 1)
+
+    def test_one_submission_per_student(self):
+        Submission.objects.create(student=self.student, assignment=self.assignment, url='https://example.com')
+        url = reverse('submissions', kwargs={'code': self.assignment.classroom.code,
+                                             'assignment_id': self.assignment.id})
+        client = APIClient()
+        client.force_authenticate(self.student)
+        self.assignment.classroom.students.add(self.student)
+        response = client.post(url, {'url': 'https://example.com/again'}, format='json')
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 409)
+        self.assertCounters(1, 0, 1)
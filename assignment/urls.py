@@ -7,6 +7,8 @@ urlpatterns = [
     path('<int:assignment_id>', views.AssignmentDetail.as_view(), name='assignment_detail'),
 
     path('<int:assignment_id>/submissions', views.Submissions.as_view(), name='submissions'),
+    path('<int:assignment_id>/submissions/bulk_grade', views.BulkGradeSubmissions.as_view(),
+         name='bulk_grade_submissions'),
     path('<int:assignment_id>/submissions/<int:submission_id>', views.GradeSubmission.as_view(), name='grade_submission'),
     path('<int:assignment_id>/student_submission', views.StudentSubmission.as_view(), name='student_submission'),
 
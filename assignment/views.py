@@ -1,8 +1,13 @@
 from datetime import datetime, timezone
 
-from classroom.models import Classroom
+from api.conditional import ConditionalListMixin
+from api.deletion import TombstoneDestroyMixin
+from api.helpers import get_upcoming_filters
+from api.models import Tombstone
+from classroom.cache import ClassroomResponseCacheMixin
+from classroom.context import get_classroom_context
 from classroom.permissions import IsTeacher
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -16,30 +21,47 @@ from assignment.permissions import (IsAssignmentPartOfClassroom,
                                     IsTeacherOrStudentReadOnly,
                                     IsTeacherOrStudentReadOnlyAssignmentDetail)
 
-from .models import Assignment, Submission
+from .helpers import ASSIGNED, MISSING
+from .models import Submission
 from .serializers import (AssignmentDetailSerializer, AssignmentSerializer,
-                          NewAssignmentSerializer, NewSubmissionSerializer,
-                          StudentSubmissionSerializer, SubmissionSerializer,
-                          TeacherSubmissionSerializer)
+                          BulkGradeSerializer, NewAssignmentSerializer,
+                          NewSubmissionSerializer, StudentSubmissionSerializer,
+                          SubmissionSerializer, TeacherSubmissionSerializer)
 
 
-class Assignments(generics.ListCreateAPIView):
+class Assignments(ConditionalListMixin, ClassroomResponseCacheMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsTeacherOrStudentReadOnly]
     serializer_class = AssignmentSerializer
+    tombstone_model = Tombstone.ASSIGNMENT
+
+    @property
+    def ordering(self):
+        if self.request.query_params.get('upcoming'):
+            return ('due_date_time', 'id')
+        return ('-created_at', 'id')
+
+    def is_response_cacheable(self, request):
+        # which assignments are upcoming changes with time, not only with writes
+        return not request.query_params.get('upcoming')
 
     def get_queryset(self):
-        code = self.kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        classroom = get_classroom_context(self.request, self.kwargs).classroom
 
         upcoming = self.request.query_params.get('upcoming')
         if upcoming:
-            return classroom.get_upcoming_assignments()
+            limit, horizon = get_upcoming_filters(self.request.query_params)
+            return classroom.get_upcoming_assignments(limit, horizon)
 
         return classroom.get_assignments()
 
+    def paginate_queryset(self, queryset):
+        # an upcoming list cut short with ?limit= can not be paginated any further
+        if self.request.query_params.get('upcoming') and self.request.query_params.get('limit'):
+            return None
+        return super().paginate_queryset(queryset)
+
     def create(self, request, **kwargs):
-        code = kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        classroom = get_classroom_context(request, kwargs).classroom
 
         request.data.update({"classroom": classroom.id})
 
@@ -58,17 +80,16 @@ class Assignments(generics.ListCreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class AssignmentDetail(generics.RetrieveUpdateDestroyAPIView):
+class AssignmentDetail(TombstoneDestroyMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated, IsAssignmentPartOfClassroom, IsTeacherOrStudentReadOnlyAssignmentDetail]
     serializer_class = AssignmentDetailSerializer
 
     def get_object(self):
-        assignment_id = self.kwargs['assignment_id']
-        return get_object_or_404(Assignment, id=assignment_id)
+        context = get_classroom_context(self.request, self.kwargs)
+        return context.get_assignment(self.kwargs['assignment_id'])
 
     def update(self, request, **kwargs):
-        code = kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        classroom = get_classroom_context(request, kwargs).classroom
         assignment = self.get_object()
 
         request.data.update({"classroom": classroom.id})
@@ -81,15 +102,22 @@ class AssignmentDetail(generics.RetrieveUpdateDestroyAPIView):
         due_date_time = datetime.fromtimestamp(due_date_timestamp / 1000.0, timezone.utc)
         request.data.update({"due_date_time": due_date_time})
 
+        previous_due_date_time = assignment.due_date_time
         serializer = NewAssignmentSerializer(assignment, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
+                if assignment.due_date_time != previous_due_date_time:
+                    assignment.update_submission_statuses()
             return Response(AssignmentSerializer(assignment).data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class Submissions(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsAssignmentPartOfClassroom, IsTeacherOrStudentPostOnlySubmissions]
+    query_budget = 9
+    ordering = ('id',)
+    statuses = (ASSIGNED, MISSING, Submission.DONE, Submission.SUBMITTED_LATE, Submission.GRADED)
 
     def get_serializer_class(self):
         request = self.request
@@ -99,21 +127,53 @@ class Submissions(generics.ListCreateAPIView):
             return NewSubmissionSerializer
 
     def get_queryset(self):
-        assignment_id = self.kwargs['assignment_id']
-        assignment = get_object_or_404(Assignment, id=assignment_id)
-        return assignment.get_all_submissions()
+        context = get_classroom_context(self.request, self.kwargs)
+        assignment = context.get_assignment(self.kwargs['assignment_id'])
 
-    def perform_create(self, serializer):
-        assignment_id = self.kwargs['assignment_id']
-        assignment = get_object_or_404(Assignment, id=assignment_id)
+        submission_status = self.request.query_params.get('status')
+        if submission_status is not None and submission_status not in self.statuses:
+            raise ValidationError({'status': [f'Status must be one of {", ".join(self.statuses)}']})
+
+        return assignment.get_all_submissions(submission_status)
+
+    def list(self, request, **kwargs):
+        context = get_classroom_context(request, kwargs)
+        assignment = context.get_assignment(kwargs['assignment_id'])
+
+        students = self.get_queryset()
+        page = self.paginate_queryset(students)
+        if page is not None:
+            students = page
+
+        submissions = [{
+            'student': student,
+            'submission': Submission.from_annotations(student, student=student, assignment=assignment),
+            'status': student.status,
+        } for student in students]
+        serializer = self.get_serializer(submissions, many=True)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def create(self, request, **kwargs):
+        context = get_classroom_context(request, kwargs)
+        assignment = context.get_assignment(kwargs['assignment_id'])
 
-        request = self.request
-        user = request.user
         # check if user has already submitted submission
-        if assignment.get_student_submission(user) is not None:
+        if assignment.get_student_submission(request.user) is not None:
+            return Response(status=status.HTTP_409_CONFLICT)
+
+        try:
+            return super().create(request, **kwargs)
+        except IntegrityError:
+            # another request from the same student got its submission in first
             return Response(status=status.HTTP_409_CONFLICT)
 
-        serializer.save(assignment=assignment, student=user)
+    def perform_create(self, serializer):
+        context = get_classroom_context(self.request, self.kwargs)
+        assignment = context.get_assignment(self.kwargs['assignment_id'])
+        serializer.save(assignment=assignment, student=self.request.user)
 
 
 class GradeSubmission(generics.UpdateAPIView):
@@ -121,8 +181,8 @@ class GradeSubmission(generics.UpdateAPIView):
     serializer_class = SubmissionSerializer
 
     def get_object(self):
-        submission_id = self.kwargs['submission_id']
-        return get_object_or_404(Submission, id=submission_id)
+        context = get_classroom_context(self.request, self.kwargs)
+        return context.get_submission(self.kwargs['submission_id'])
 
     def perform_update(self, serializer):
         try:
@@ -132,12 +192,29 @@ class GradeSubmission(generics.UpdateAPIView):
         serializer.save(points=points)
 
 
+class BulkGradeSubmissions(APIView):
+    permission_classes = [IsAuthenticated, IsAssignmentPartOfClassroom, IsTeacher]
+    query_budget = 10
+
+    def post(self, request, **kwargs):
+        context = get_classroom_context(request, kwargs)
+        assignment = context.get_assignment(kwargs['assignment_id'])
+
+        # all grades are saved or, when any of them is invalid, none
+        with transaction.atomic():
+            serializer = BulkGradeSerializer(data=request.data, context={'assignment': assignment})
+            serializer.is_valid(raise_exception=True)
+            submissions = assignment.grade_submissions(serializer.validated_data['grades'])
+
+        return Response(SubmissionSerializer(submissions, many=True).data)
+
+
 class StudentSubmission(APIView):
     permission_classes = [IsAuthenticated, IsAssignmentPartOfClassroom, IsStudentReadOnly]
 
     def get(self, request, **kwargs):
-        assignment_id = kwargs['assignment_id']
-        assignment = get_object_or_404(Assignment, id=assignment_id)
+        context = get_classroom_context(request, kwargs)
+        assignment = context.get_assignment(kwargs['assignment_id'])
         user = request.user
 
         submission = assignment.get_student_submission(user)
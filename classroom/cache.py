@@ -0,0 +1,80 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .context import get_classroom_context
+
+HITS_KEY = 'classroom_response_cache:hits'
+MISSES_KEY = 'classroom_response_cache:misses'
+
+
+def get_version_key(classroom_id):
+    return f'classroom_version:{classroom_id}'
+
+
+def get_classroom_version(classroom_id):
+    key = get_version_key(classroom_id)
+    version = cache.get(key)
+    if version is None:
+        # start from the current time rather than 1, so that a version lost to
+        # eviction can not come back and serve responses cached before it was lost
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_classroom_version(classroom_id):
+    key = get_version_key(classroom_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_response_cache_stats():
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {'hits': stats.get(HITS_KEY, 0), 'misses': stats.get(MISSES_KEY, 0)}
+
+
+class ClassroomResponseCacheMixin:
+    # caches the GET response of a classroom endpoint, the same for every member,
+    # until anything in the classroom is written and its version is bumped
+
+    def is_response_cacheable(self, request):
+        return True
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            return super().get(request, *args, **kwargs)
+
+        classroom = get_classroom_context(request, kwargs).classroom
+        # the check get_object would have made, the response may come from the cache
+        self.check_object_permissions(request, classroom)
+
+        version = get_classroom_version(classroom.id)
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        key = f'classroom_response:{classroom.id}:{version}:{url}'
+
+        data = cache.get(key)
+        if data is not None:
+            increment(HITS_KEY)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        increment(MISSES_KEY)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CLASSROOM_RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
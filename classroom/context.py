@@ -0,0 +1,81 @@
+from announcement.models import Announcement, Comment
+from assignment.models import Assignment, Submission
+from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
+
+from .models import Classroom
+
+
+# Holds the classroom named in the url, the caller's role in it and any other rows
+# named in the url, each fetched at most once per request so that permission
+# classes and views share the same lookups
+class ClassroomContext:
+    def __init__(self, user, code):
+        self.user = user
+        self.code = code
+        self._assignments = {}
+        self._submissions = {}
+        self._announcements = {}
+        self._comments = {}
+        self._users = {}
+
+    @cached_property
+    def classroom(self):
+        return get_object_or_404(Classroom.objects.select_related('teacher'), code=self.code)
+
+    @cached_property
+    def role(self):
+        return self.classroom.get_user_role(self.user)
+
+    @property
+    def is_teacher(self):
+        return self.role == 'teacher'
+
+    @property
+    def is_student(self):
+        return self.role == 'student'
+
+    @property
+    def is_member(self):
+        return self.role is not None
+
+    def get_assignment(self, assignment_id):
+        if assignment_id not in self._assignments:
+            self._assignments[assignment_id] = get_object_or_404(Assignment, id=assignment_id)
+        return self._assignments[assignment_id]
+
+    def get_submission(self, submission_id):
+        if submission_id not in self._submissions:
+            queryset = Submission.objects.select_related('student', 'assignment')
+            self._submissions[submission_id] = get_object_or_404(queryset, id=submission_id)
+        return self._submissions[submission_id]
+
+    def get_announcement(self, announcement_id):
+        if announcement_id not in self._announcements:
+            self._announcements[announcement_id] = get_object_or_404(Announcement, id=announcement_id)
+        return self._announcements[announcement_id]
+
+    def get_comment(self, comment_id):
+        if comment_id not in self._comments:
+            self._comments[comment_id] = get_object_or_404(Comment, id=comment_id)
+        return self._comments[comment_id]
+
+    def get_user(self, user_id):
+        if user_id not in self._users:
+            self._users[user_id] = get_object_or_404(get_user_model(), id=user_id)
+        return self._users[user_id]
+
+
+def get_classroom_context(request, kwargs):
+    # contexts live on the underlying django request so that every DRF wrapper
+    # of the same request (and every permission class) sees the same instance
+    http_request = getattr(request, '_request', request)
+    contexts = getattr(http_request, 'classroom_contexts', None)
+    if contexts is None:
+        contexts = http_request.classroom_contexts = {}
+
+    code = kwargs['code']
+    if code not in contexts:
+        contexts[code] = ClassroomContext(request.user, code)
+    return contexts[code]
@@ -0,0 +1,160 @@
+import csv
+import json
+
+from assignment.helpers import ASSIGNED, MISSING, get_unsubmitted_status
+from assignment.models import Submission
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.fields import DateTimeField
+
+# a status is sent as its index in this list
+STATUSES = [ASSIGNED, MISSING, Submission.DONE, Submission.SUBMITTED_LATE, Submission.GRADED]
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+
+def get_gradebook(classroom):
+    # the students x assignments grid in columns: id vectors for both axes and
+    # row-major arrays of every cell's status code and points, cell
+    # [row * len(assignments) + column] is the student of row's submission for
+    # the assignment of column
+    students = list(classroom.get_all_students().values_list('id', 'first_name', 'last_name'))
+    assignments = list(classroom.assignment_set.order_by('due_date_time', 'id').values_list(
+        'id', 'title', 'due_date_time', 'points'))
+    submissions = Submission.objects.filter(assignment__classroom=classroom).values_list(
+        'student_id', 'assignment_id', 'status', 'points')
+
+    width = len(assignments)
+    row_offsets = {student_id: row * width for row, (student_id, *_) in enumerate(students)}
+    columns = {assignment_id: column for column, (assignment_id, *_) in enumerate(assignments)}
+    status = [STATUS_CODES[get_unsubmitted_status(due_date_time)] for _, _, due_date_time, _ in assignments]
+    status *= len(students)
+    points = [None] * len(status)
+    for student_id, assignment_id, submission_status, submission_points in submissions.iterator():
+        offset = row_offsets.get(student_id)
+        # submissions of students that left the classroom stay in the database
+        if offset is None:
+            continue
+        cell = offset + columns[assignment_id]
+        status[cell] = STATUS_CODES[submission_status]
+        points[cell] = submission_points
+
+    date_time = DateTimeField()
+    return {
+        'shape': [len(students), width],
+        'students': {
+            'id': [student_id for student_id, _, _ in students],
+            'name': [first_name + ' ' + last_name for _, first_name, last_name in students],
+        },
+        'assignments': {
+            'id': [assignment_id for assignment_id, _, _, _ in assignments],
+            'title': [title for _, title, _, _ in assignments],
+            'due_date_time': [date_time.to_representation(due_date_time) for _, _, due_date_time, _ in assignments],
+            'points': [assignment_points for _, _, _, assignment_points in assignments],
+        },
+        'statuses': STATUSES,
+        'status': status,
+        'points': points,
+    }
+
+
+EXPORT_FIELDS = ['classroom', 'classroom_name', 'student_id', 'student_name', 'student_email', 'assignment_id',
+                 'assignment_title', 'due_date_time', 'max_points', 'status', 'points', 'submitted_at']
+
+
+def get_date_time_formatter():
+    # renders like DateTimeField, which looks up the current time zone for every value
+    current_timezone = timezone.get_current_timezone()
+
+    def format_date_time(value):
+        value = value.astimezone(current_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return format_date_time
+
+
+def iter_gradebook_rows(classrooms, chunk_size=2000):
+    # one row per student and assignment. The roster and the submissions are read
+    # in chunks, both ordered by student, and merged so that only the
+    # assignments and a single student's submissions are held at a time
+    format_date_time = get_date_time_formatter()
+    for classroom in classrooms:
+        assignments = [
+            (assignment_id, title, format_date_time(due_date_time), points,
+             get_unsubmitted_status(due_date_time))
+            for assignment_id, title, due_date_time, points in classroom.assignment_set.order_by(
+                'due_date_time', 'id').values_list('id', 'title', 'due_date_time', 'points')
+        ]
+        roster = classroom.get_all_students().values_list('id', 'first_name', 'last_name', 'email')
+        submissions = Submission.objects.filter(assignment__classroom=classroom).order_by('student_id').values_list(
+            'student_id', 'assignment_id', 'status', 'points', 'created_at').iterator(chunk_size=chunk_size)
+
+        submission = next(submissions, None)
+        for student_id, first_name, last_name, email in roster.iterator(chunk_size=chunk_size):
+            student_submissions = {}
+            # submissions of students that left the classroom sort in between and are skipped
+            while submission is not None and submission[0] <= student_id:
+                if submission[0] == student_id:
+                    student_submissions[submission[1]] = submission
+                submission = next(submissions, None)
+
+            student = (classroom.code, classroom.name, student_id, first_name + ' ' + last_name, email)
+            for assignment_id, title, due_date_time, max_points, unsubmitted_status in assignments:
+                if assignment_id in student_submissions:
+                    _, _, status, points, created_at = student_submissions[assignment_id]
+                    submitted_at = format_date_time(created_at)
+                else:
+                    status, points, submitted_at = unsubmitted_status, None, None
+                yield student + (assignment_id, title, due_date_time, max_points, status, points, submitted_at)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def write_csv(rows, batch_size=500):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow(row))
+        if len(batch) == batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def write_ndjson(rows, batch_size=500):
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n')
+        if len(batch) == batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+# writer and content type by the extension of the export's url
+EXPORT_FORMATS = {
+    'csv': (write_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (write_ndjson, 'application/x-ndjson'),
+}
+
+
+def get_export_response(classrooms, export_format, filename):
+    if export_format not in EXPORT_FORMATS:
+        raise Http404
+    write, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(write(iter_gradebook_rows(classrooms)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+class ExportViewMixin:
+    # the format is named by the url's extension, only errors go through the renderers
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(request, force=True)
@@ -0,0 +1,51 @@
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from classroom.models import Classroom
+
+
+class Command(BaseCommand):
+    help = 'Time classroom membership checks against growing rosters. All rows created are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000, 5000])
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        repeat = options['repeat']
+
+        self.stdout.write(f'{"roster":>8} {"member exists":>15} {"outsider exists":>17} {"cached role":>13}')
+        with transaction.atomic():
+            teacher = User.objects.create(username='benchmark_membership_teacher')
+            outsider = User.objects.create(username='benchmark_membership_outsider')
+
+            for size in sorted(options['sizes']):
+                classroom = Classroom.objects.create(teacher=teacher, name='Benchmark', subject='Benchmark')
+                students = User.objects.bulk_create(
+                    User(username=f'benchmark_membership_{classroom.id}_{i}') for i in range(size)
+                )
+                Classroom.students.through.objects.bulk_create(
+                    Classroom.students.through(classroom_id=classroom.id, user_id=student.id) for student in students
+                )
+                member = students[-1]
+
+                member_time = self.time(lambda: classroom.is_user_a_student(member), repeat)
+                outsider_time = self.time(lambda: classroom.is_user_a_student(outsider), repeat)
+                classroom.get_user_role(member)
+                cached_time = self.time(lambda: classroom.get_user_role(member), repeat)
+                cache.delete(classroom.get_role_cache_key(member.id))
+
+                self.stdout.write(f'{size:>8} {member_time:>13.3f}ms {outsider_time:>15.3f}ms {cached_time:>11.3f}ms')
+
+            transaction.set_rollback(True)
+
+    def time(self, check, repeat):
+        start = perf_counter()
+        for _ in range(repeat):
+            check()
+        return (perf_counter() - start) * 1000 / repeat
@@ -1,10 +1,13 @@
-from datetime import datetime, timezone
-
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F, FilteredRelation, Q, Sum
+from django.db.models.functions import Coalesce, Lower
+from django.db.models.signals import m2m_changed
 from django.utils.crypto import get_random_string
 
-from assignment.helpers import get_student_submission_data
+from assignment.helpers import get_status_expression
 
 
 class Classroom(models.Model):
@@ -15,6 +18,13 @@ class Classroom(models.Model):
     code = models.CharField(max_length=CODE_LEN, unique=True)
     students = models.ManyToManyField(get_user_model(), related_name='enrolled_classrooms')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the teacher as loaded, so that save can tell when it changes
+        instance._loaded_teacher_id = instance.__dict__.get('teacher_id')
+        return instance
+
     def save(self, *args, **kwargs):
         # save is also called when a classroom is updated, so this check prevents updation of code
         if self.code == '':
@@ -25,52 +35,125 @@ class Classroom(models.Model):
 
         super().save(*args, **kwargs)
 
-    def get_upcoming_assignments(self):
-        all_assignments = self.assignment_set.all().order_by('-due_date_time')
-        upcoming_assignments = [assignment for assignment in all_assignments
-                                if assignment.due_date_time > datetime.now(timezone.utc)]
+        loaded_teacher_id = getattr(self, '_loaded_teacher_id', None)
+        if loaded_teacher_id is not None and loaded_teacher_id != self.teacher_id:
+            cache.delete_many([self.get_role_cache_key(loaded_teacher_id), self.get_role_cache_key(self.teacher_id)])
+        self._loaded_teacher_id = self.teacher_id
 
-        if len(upcoming_assignments) > 0:
-            upcoming_assignments.sort(key=lambda assignment: assignment.due_date_time)
-            return upcoming_assignments
+    def get_upcoming_assignments(self, limit=None, horizon=None):
+        upcoming_assignments = self.assignment_set.upcoming(horizon)
+        if limit is not None:
+            return upcoming_assignments[:limit]
+        return upcoming_assignments
 
-        return None
+    def get_review_counters(self):
+        return self.assignment_set.aggregate(
+            turned_in=Coalesce(Sum('turned_in_count'), 0),
+            graded=Coalesce(Sum('graded_count'), 0),
+        )
 
     def get_announcements(self):
-        return self.announcement_set.all().order_by('-created_at')
+        return self.announcement_set.select_related('author').order_by('-created_at', 'id')
 
     def get_assignments(self):
-        return self.assignment_set.all().order_by('-created_at')
+        return self.assignment_set.all().order_by('-created_at', 'id')
 
     def get_assignments_todo(self, student):
-        assignments_todo = []
-
-        for assignment in self.get_assignments():
-            submission = assignment.get_student_submission(student)
-            if submission is None:
-                assignments_todo.append(assignment)
-        return assignments_todo
+        return self.get_assignments().not_submitted_by(student)
 
     def get_all_students(self):
-        return self.students.all()
+        return self.students.order_by('id')
 
     def is_user_a_teacher(self, user):
-        return user == self.teacher
+        return user.id == self.teacher_id
 
     def is_user_a_student(self, user):
-        return user in self.students.all()
+        return self.students.filter(id=user.id).exists()
 
     def is_user_part_of_classroom(self, user):
-        return self.is_user_a_student(user) or self.is_user_a_teacher(user)
+        return self.is_user_a_teacher(user) or self.is_user_a_student(user)
+
+    def get_role_cache_key(self, user_id):
+        return f'classroom_role:{self.id}:{user_id}'
+
+    def get_user_role(self, user):
+        key = self.get_role_cache_key(user.id)
+        role = cache.get(key)
+        if role is None:
+            if self.is_user_a_teacher(user):
+                role = 'teacher'
+            elif self.is_user_a_student(user):
+                role = 'student'
+            else:
+                # cache non-members too, an empty string tells them apart from a miss
+                role = ''
+            cache.set(key, role, settings.CLASSROOM_ROLE_CACHE_TIMEOUT)
+
+        return role or None
+
+    def add_student(self, user):
+        self.students.add(user)
+        cache.delete(self.get_role_cache_key(user.id))
+
+    def enroll_students(self, emails):
+        # emails are matched case insensitively and reported lowercased. The roster
+        # rows are inserted at once, bulk_create sends no m2m_changed of its own so
+        # it is sent here for the version and event receivers, as students.add would
+        emails = list(dict.fromkeys(email.strip().lower() for email in emails if email.strip()))
+        users = {}
+        # the oldest account wins when several share an email
+        for user_id, email in get_user_model().objects.annotate(email_lower=Lower('email')).filter(
+                email_lower__in=emails).order_by('-id').values_list('id', 'email_lower'):
+            users[email] = user_id
+
+        Enrollment = self.students.through
+        members = set(Enrollment.objects.filter(classroom_id=self.id, user_id__in=users.values()).values_list(
+            'user_id', flat=True))
+        members.add(self.teacher_id)
+
+        report = {'enrolled': [], 'already_enrolled': [], 'not_found': []}
+        new_ids = set()
+        for email in emails:
+            if email not in users:
+                report['not_found'].append(email)
+            elif users[email] in members:
+                report['already_enrolled'].append(email)
+            else:
+                report['enrolled'].append(email)
+                new_ids.add(users[email])
+
+        if new_ids:
+            signal_kwargs = {'sender': Enrollment, 'instance': self, 'reverse': False, 'model': get_user_model(),
+                             'pk_set': new_ids, 'using': Enrollment.objects.db}
+            with transaction.atomic():
+                m2m_changed.send(action='pre_add', **signal_kwargs)
+                # rows enrolled concurrently since the lookup above are skipped
+                Enrollment.objects.bulk_create(
+                    [Enrollment(classroom_id=self.id, user_id=user_id) for user_id in new_ids], ignore_conflicts=True)
+                m2m_changed.send(action='post_add', **signal_kwargs)
+            # only after commit, a member reading in between would otherwise cache
+            # the role of the uncommitted roster
+            role_keys = [self.get_role_cache_key(user_id) for user_id in new_ids]
+            transaction.on_commit(lambda: cache.delete_many(role_keys))
+        return report
+
+    def remove_student(self, user):
+        self.students.remove(user)
+        cache.delete(self.get_role_cache_key(user.id))
 
     def get_student_submissions(self, student):
-        submissions = []
-        for assignment in self.assignment_set.all().order_by('-created_at'):
-            submission = assignment.get_student_submission(student)
-            data = get_student_submission_data(assignment, student, submission)
-            submissions.append(data)
-
-        return submissions
+        # every assignment left joined with the student's submission for it, the
+        # submission's columns and its status are annotated on the assignment rows
+        return self.assignment_set.annotate(
+            student_submission=FilteredRelation('submission', condition=Q(submission__student=student)),
+        ).annotate(
+            submission_id=F('student_submission__id'),
+            submission_url=F('student_submission__url'),
+            submission_created_at=F('student_submission__created_at'),
+            submission_points=F('student_submission__points'),
+            submission_status=F('student_submission__status'),
+            status=get_status_expression('student_submission__status', 'due_date_time'),
+        ).order_by('-created_at')
 
     def __str__(self):
         return f'Name: {self.name}-Subject: {self.subject}'
@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_classroom_version
+from .models import Classroom
+
+
+def bump_on_commit(classroom_id):
+    # only after commit, a reader that misses in between would otherwise cache
+    # the old rows under the new version
+    transaction.on_commit(lambda: bump_classroom_version(classroom_id))
+
+
+@receiver(post_save, sender='announcement.Announcement')
+@receiver(post_delete, sender='announcement.Announcement')
+@receiver(post_save, sender='assignment.Assignment')
+@receiver(post_delete, sender='assignment.Assignment')
+def bump_version_on_classroom_content_change(sender, instance, **kwargs):
+    bump_on_commit(instance.classroom_id)
+
+
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+def bump_version_on_classroom_change(sender, instance, **kwargs):
+    bump_on_commit(instance.id)
+
+
+@receiver(m2m_changed, sender=Classroom.students.through)
+def bump_version_on_enrollment_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+
+    if reverse:
+        # the roster was changed from the user's side, instance is the user
+        for classroom_id in pk_set or []:
+            bump_on_commit(classroom_id)
+    else:
+        bump_on_commit(instance.id)
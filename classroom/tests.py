@@ -1,3 +1,196 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from announcement.models import Announcement
+from asgiref.sync import sync_to_async
+from assignment.helpers import ASSIGNED, MISSING
+from assignment.models import Assignment, Submission
+from classroom_project.handlers import ASGIHandler
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model
+from rest_framework.test import APIClient
+
+from .cache import get_classroom_version
+from .gradebook import get_gradebook
+from .models import Classroom
+
+
+class ClassroomCacheTests(TestCase):
+    def setUp(self):
+        # ids repeat between tests, so would the cache keys
+        cache.clear()
+        User = get_user_model()
+        self.teacher = User.objects.create(username='teacher', email='teacher@example.com')
+        self.student = User.objects.create(username='student', email='student@example.com')
+        self.classroom = Classroom.objects.create(teacher=self.teacher, name='Classroom', subject='Subject')
+        self.classroom.students.add(self.student)
+        self.announcement = Announcement.objects.create(classroom=self.classroom, author=self.teacher, text='Text')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.url = reverse('announcements', kwargs={'code': self.classroom.code})
+
+    def get_announcements(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache'], [announcement['text'] for announcement in response.data]
+
+    def test_writes_invalidate_cached_responses(self):
+        self.assertEqual(self.get_announcements(), ('MISS', ['Text']))
+        self.assertEqual(self.get_announcements(), ('HIT', ['Text']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'text': 'New'})
+        self.assertEqual(self.get_announcements(), ('MISS', ['New', 'Text']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('announcement_detail', kwargs={'code': self.classroom.code,
+                                                                      'announcement_id': self.announcement.id}))
+        self.assertEqual(self.get_announcements(), ('MISS', ['New']))
+
+    def test_version_is_bumped_after_commit(self):
+        version = get_classroom_version(self.classroom.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Announcement.objects.create(classroom=self.classroom, author=self.teacher, text='New')
+            # a reader in between caches the old rows under the old version
+            self.assertEqual(get_classroom_version(self.classroom.id), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_classroom_version(self.classroom.id), version)
+
+    def test_roles_follow_enrollment(self):
+        outsider = get_user_model().objects.create(username='outsider', email='outsider@example.com')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.classroom.add_student(outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.classroom.remove_student(outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class GradebookMixin:
+    def setUp(self):
+        User = get_user_model()
+        self.teacher = User.objects.create(username='teacher', email='teacher@example.com')
+        # the student that leaves sorts in between the others
+        self.students = [User.objects.create(username=f'student{i}', first_name='Student', last_name=str(i),
+                                             email=f'student{i}@example.com') for i in range(3)]
+        self.classroom = Classroom.objects.create(teacher=self.teacher, name='Classroom', subject='Subject')
+        self.classroom.students.add(*self.students)
+        now = timezone.now()
+        self.past = Assignment.objects.create(classroom=self.classroom, title='Past', text='Text',
+                                              due_date_time=now - timedelta(days=1), points=10)
+        self.future = Assignment.objects.create(classroom=self.classroom, title='Future', text='Text',
+                                                due_date_time=now + timedelta(days=1), points=20)
+        Submission.objects.create(student=self.students[0], assignment=self.past, url='https://example.com', points=8)
+        Submission.objects.create(student=self.students[1], assignment=self.past, url='https://example.com')
+        Submission.objects.create(student=self.students[2], assignment=self.future, url='https://example.com')
+        self.classroom.remove_student(self.students[1])
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+
+class GradebookTestCase(GradebookMixin, TestCase):
+    pass
+
+
+class GradebookTests(GradebookTestCase):
+    def test_grid(self):
+        with self.assertNumQueries(3):
+            gradebook = get_gradebook(self.classroom)
+
+        self.assertEqual(gradebook['shape'], [2, 2])
+        self.assertEqual(gradebook['students']['id'], [self.students[0].id, self.students[2].id])
+        self.assertEqual(gradebook['assignments']['id'], [self.past.id, self.future.id])
+        # row by row, the assignments due first come first
+        self.assertEqual([gradebook['statuses'][code] for code in gradebook['status']],
+                         [Submission.GRADED, ASSIGNED, MISSING, Submission.DONE])
+        self.assertEqual(gradebook['points'], [8, None, None, None])
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('gradebook', kwargs={'code': self.classroom.code}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['shape'], [2, 2])
+
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(reverse('gradebook', kwargs={'code': self.classroom.code})).status_code, 403)
+
+
+def get_cells(rows):
+    return [(row['classroom'], int(row['student_id']), int(row['assignment_id']), row['status'],
+             float(row['points']) if row['points'] not in ('', None) else None) for row in rows]
+
+
+class GradebookExportTests(GradebookTestCase):
+    def export(self, export_format, url_name='gradebook_export', **kwargs):
+        response = self.client.get(reverse(url_name, kwargs={'export_format': export_format, **kwargs}))
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def get_expected_cells(self):
+        code = self.classroom.code
+        return [
+            (code, self.students[0].id, self.past.id, Submission.GRADED, 8),
+            (code, self.students[0].id, self.future.id, ASSIGNED, None),
+            (code, self.students[2].id, self.past.id, MISSING, None),
+            (code, self.students[2].id, self.future.id, Submission.DONE, None),
+        ]
+
+    def test_csv(self):
+        content = self.export('csv', code=self.classroom.code)
+        self.assertEqual(get_cells(csv.DictReader(io.StringIO(content))), self.get_expected_cells())
+
+    def test_ndjson(self):
+        content = self.export('ndjson', code=self.classroom.code)
+        self.assertEqual(get_cells(json.loads(line) for line in content.splitlines()), self.get_expected_cells())
+
+    def test_unknown_format(self):
+        url = reverse('gradebook_export', kwargs={'code': self.classroom.code, 'export_format': 'xlsx'})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_teaching_export(self):
+        other = Classroom.objects.create(teacher=self.teacher, name='Other', subject='Subject')
+        other.students.add(self.students[1])
+        assignment = Assignment.objects.create(classroom=other, title='Other', text='Text',
+                                               due_date_time=timezone.now() + timedelta(days=1), points=5)
+        # a classroom of another teacher is left out
+        Classroom.objects.create(teacher=self.students[0], name='Not taught', subject='Subject')
+
+        content = self.export('csv', url_name='teaching_gradebook_export')
+        self.assertEqual(get_cells(csv.DictReader(io.StringIO(content))), self.get_expected_cells() + [
+            (other.code, self.students[1].id, assignment.id, ASSIGNED, None)])
+
+
+class ASGIExportTests(GradebookMixin, TransactionTestCase):
+    # the view runs in the handler's thread, the rows have to be committed
+    async def test_export_streams(self):
+        await sync_to_async(get_access_token_model().objects.create)(
+            user=self.teacher, token='export', expires=timezone.now() + timedelta(hours=1), scope='read write')
+        url = reverse('gradebook_export', kwargs={'code': self.classroom.code, 'export_format': 'csv'})
+        scope = {'type': 'http', 'method': 'GET', 'path': url, 'query_string': b'', 'scheme': 'http',
+                 'server': ('testserver', 80), 'headers': [(b'host', b'testserver'),
+                                                          (b'authorization', b'Bearer export')]}
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await ASGIHandler()(scope, receive, send)
+
+        self.assertEqual(messages[0]['status'], 200)
+        # the rows are sent as they are written, the last message ends the body
+        self.assertGreater(len(messages), 3)
+        self.assertEqual(messages[-1], {'type': 'http.response.body'})
+        content = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(content)))), 4)
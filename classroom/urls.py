@@ -7,11 +7,17 @@ urlpatterns = [
 
     path('user_role', views.UserRole.as_view(), name='user_role'),
 
+    path('dashboard', views.ClassroomDashboard.as_view(), name='classroom_dashboard'),
+
     path('announcements/', include('announcement.urls')),
 
     path('assignments/', include('assignment.urls')),
 
     path('students/', include('student.urls')),
 
+    path('gradebook', views.Gradebook.as_view(), name='gradebook'),
+
+    path('gradebook/export.<str:export_format>', views.GradebookExport.as_view(), name='gradebook_export'),
+
     path('student_submissions/<int:student_id>', views.StudentSubmissions.as_view(), name='student_submissions'),
 ]
@@ -1,7 +1,11 @@
+from api.deletion import TombstoneDestroyMixin
+from api.pagination import KeysetPagination
 from api.permissions import IsTeacherOrStudentReadOnly
+from api.serializers import ClassroomDashboardSerializer
+from assignment.models import Submission
 from assignment.serializers import StudentSubmissionsSerializer
-from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db.models import Count
+from django.urls import reverse
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -10,44 +14,103 @@ from rest_framework.views import APIView
 from classroom.permissions import (IsStudentInStudentSubmissions, IsTeacher,
                                    IsTeacherOrStudent)
 
+from .cache import ClassroomResponseCacheMixin
+from .context import get_classroom_context
+from .gradebook import ExportViewMixin, get_export_response, get_gradebook
 from .models import Classroom
 from .serializers import ClassroomSerializer, UserRoleSerializer
 
 
-class ClassroomDetail(generics.RetrieveUpdateDestroyAPIView):
+class ClassroomDetail(TombstoneDestroyMixin, ClassroomResponseCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Classroom.objects.all()
     lookup_field = 'code'
 
     permission_classes = [IsAuthenticated, IsTeacherOrStudentReadOnly]
     serializer_class = ClassroomSerializer
 
+    def get_object(self):
+        classroom = get_classroom_context(self.request, self.kwargs).classroom
+        self.check_object_permissions(self.request, classroom)
+        return classroom
+
 
 class UserRole(APIView):
     permission_classes = [IsAuthenticated, IsTeacherOrStudent]
 
     def get(self, request, **kwargs):
-        code = kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
-        user = request.user
-
-        if classroom.is_user_a_teacher(user):
-            role = 'teacher'
-        elif classroom.is_user_a_student(user):
-            role = 'student'
+        role = get_classroom_context(request, kwargs).role
 
         serializer = UserRoleSerializer(data={'role': role})
         if serializer.is_valid():
             return Response(serializer.data)
 
 
+class ClassroomDashboard(APIView):
+    permission_classes = [IsAuthenticated, IsTeacherOrStudent]
+    query_budget = 5
+    announcements_page_size = 10
+    upcoming_assignments_limit = 5
+
+    def get(self, request, **kwargs):
+        context = get_classroom_context(request, kwargs)
+        classroom = context.classroom
+
+        # the first page of the announcements endpoint, its next link continues there
+        paginator = KeysetPagination()
+        paginator.page_size = self.announcements_page_size
+        paginator.ordering = ('-created_at', 'id')
+        announcements = paginator.paginate_queryset(
+            classroom.get_announcements().annotate(comment_count=Count('comment')), request, view=self)
+        paginator.base_url = request.build_absolute_uri(
+            f'{reverse("announcements", kwargs={"code": classroom.code})}?page_size={paginator.page_size}')
+
+        serializer = ClassroomDashboardSerializer({
+            'classroom': classroom,
+            'role': context.role,
+            'announcements': announcements,
+            'more_announcements': paginator.get_next_link(),
+            'upcoming_assignments': classroom.get_upcoming_assignments(self.upcoming_assignments_limit),
+            'review': classroom.get_review_counters() if context.is_teacher else None,
+        })
+        return Response(serializer.data)
+
+
+class Gradebook(APIView):
+    permission_classes = [IsAuthenticated, IsTeacher]
+    query_budget = 5
+
+    def get(self, request, **kwargs):
+        classroom = get_classroom_context(request, kwargs).classroom
+        return Response(get_gradebook(classroom))
+
+
+class GradebookExport(ExportViewMixin, APIView):
+    permission_classes = [IsAuthenticated, IsTeacher]
+
+    def get(self, request, export_format, **kwargs):
+        classroom = get_classroom_context(request, kwargs).classroom
+        return get_export_response([classroom], export_format, f'{classroom.code}-gradebook')
+
+
 class StudentSubmissions(generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsTeacher, IsStudentInStudentSubmissions]
+    query_budget = 5
     serializer_class = StudentSubmissionsSerializer
 
     def get_queryset(self):
-        code = self.kwargs['code']
-        student_id = self.kwargs['student_id']
-        classroom = get_object_or_404(Classroom, code=code)
-        student = get_object_or_404(get_user_model(), id=student_id)
+        context = get_classroom_context(self.request, self.kwargs)
+        classroom = context.classroom
+        student = context.get_user(self.kwargs['student_id'])
 
         return classroom.get_student_submissions(student)
+
+    def list(self, request, **kwargs):
+        student = get_classroom_context(request, kwargs).get_user(kwargs['student_id'])
+
+        submissions = ({
+            'submission': Submission.from_annotations(assignment, student=student, assignment=assignment),
+            'status': assignment.status,
+            'assignment': assignment,
+        } for assignment in self.get_queryset().iterator())
+        serializer = self.get_serializer(submissions, many=True)
+        return Response(serializer.data)
@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from .handlers import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'classroom_project.settings')
 
-application = get_asgi_application()
+# get_asgi_application with the handler that streams responses from the view's thread
+django.setup(set_prefix=False)
+django_application = ASGIHandler()
+
+# imported once django is set up, the event streams use the models
+from api.streams import EventStreamRouter  # noqa: E402
+
+application = EventStreamRouter(django_application)
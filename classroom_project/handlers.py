@@ -0,0 +1,34 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    # django 4.0 iterates streaming responses in the event loop, where their
+    # iterators can not query the database. Here each part is produced in the
+    # thread that ran the view instead
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        parts = iter(response)
+        response.streaming_content = []
+
+        async def send_start(message):
+            # django's closing message for the emptied content, the body follows below
+            if message['type'] == 'http.response.start':
+                await send(message)
+
+        # django closes the response once it sent the emptied content, which
+        # would close the iterator before it produced anything
+        response.close = lambda: None
+        await super().send_response(response, send_start)
+        del response.close
+
+        next_part = sync_to_async(next, thread_sensitive=True)
+        try:
+            while (part := await next_part(parts, None)) is not None:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
@@ -1,3 +1,4 @@
+from drf_spectacular.contrib.django_oauth_toolkit import DjangoOAuthToolkitScheme
 from drf_spectacular.extensions import OpenApiAuthenticationExtension
 from drf_spectacular.plumbing import build_bearer_security_scheme_object
 
@@ -12,3 +13,19 @@ class MyAuthenticationScheme(OpenApiAuthenticationExtension):
             header_name='Authorization',
             token_prefix='Bearer',
         )
+
+
+class CachedOAuth2AuthenticationScheme(DjangoOAuthToolkitScheme):
+    target_class = 'user.authentication.CachedOAuth2Authentication'
+
+
+class BatchAuthenticationScheme(OpenApiAuthenticationExtension):
+    # only authenticates the sub-requests of a batch, it is not documented
+    target_class = 'api.batch.BatchAuthentication'
+    name = []
+
+    def get_security_requirement(self, auto_schema):
+        return None
+
+    def get_security_definition(self, auto_schema):
+        return []
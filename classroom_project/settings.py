@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.instrumentation.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -100,6 +101,28 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+REDIS_URL = config('REDIS_URL', default='')
+
+# every worker process has its own local memory cache, deployments with more
+# than one worker need the shared redis cache for invalidations to reach all of them
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -144,10 +167,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
+        'user.authentication.CachedOAuth2Authentication',
         'drf_social_oauth2.authentication.SocialAuthentication',
+        'api.batch.BatchAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
 }
 
 AUTHENTICATION_BACKENDS = (
@@ -158,6 +183,46 @@ AUTHENTICATION_BACKENDS = (
 
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS').split(",")
 
+# Seconds for which a user's role in a classroom is cached
+CLASSROOM_ROLE_CACHE_TIMEOUT = config('CLASSROOM_ROLE_CACHE_TIMEOUT', default=60 * 5, cast=int)
+
+# Seconds for which a validated access token and its user are cached, never longer than the token is valid.
+# Only with the shared redis cache, revoking a token has to reach every worker
+ACCESS_TOKEN_CACHE_TIMEOUT = config('ACCESS_TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+
+# Seconds for which classroom responses are cached, writes to the classroom invalidate them sooner
+CLASSROOM_RESPONSE_CACHE_TIMEOUT = config('CLASSROOM_RESPONSE_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# Days for which deletions are kept for /api/sync, older cursors have to sync from scratch
+SYNC_TOMBSTONE_RETENTION_DAYS = config('SYNC_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+# Most rows of each kind one /api/sync response carries, the client continues from its cursor while has_more
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)
+
+# Most sub-requests one /api/batch request may carry
+BATCH_MAX_REQUESTS = config('BATCH_MAX_REQUESTS', default=20, cast=int)
+
+# Seconds a batch may run, sub-requests not started by then are answered with 503
+BATCH_TIME_BUDGET_SECONDS = config('BATCH_TIME_BUDGET_SECONDS', default=10, cast=float)
+
+# Most submissions one bulk grading request may grade
+BULK_GRADE_MAX_SUBMISSIONS = config('BULK_GRADE_MAX_SUBMISSIONS', default=500, cast=int)
+
+# Most students one bulk enrollment request may enroll, rosters imported from a file have no limit
+BULK_ENROLL_MAX_STUDENTS = config('BULK_ENROLL_MAX_STUDENTS', default=1000, cast=int)
+
+# Broker behind the event streams, like the cache it has to be redis for events to reach other worker processes
+EVENTS_BACKEND = config('EVENTS_BACKEND', default='api.events.RedisBackend' if REDIS_URL else 'api.events.LocalBackend')
+
+# Seconds between the comments sent on idle event streams to keep proxies from closing them
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=15, cast=int)
+
+# Seconds between the checks that an open event stream's token is still valid and its user still a member
+EVENTS_RECHECK_SECONDS = config('EVENTS_RECHECK_SECONDS', default=60, cast=int)
+
+# Raise instead of logging a warning when a view runs more queries than its query_budget
+QUERY_BUDGET_ENFORCED = config('QUERY_BUDGET_ENFORCED', default=False, cast=bool)
+
 # Google configuration
 SOCIAL_AUTH_GOOGLE_OAUTH2_KEY = config('SOCIAL_AUTH_GOOGLE_OAUTH2_KEY')
 SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = config('SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET')
@@ -174,4 +239,14 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# The schema generated by `manage.py build_schema`, served outside of DEBUG
+OPENAPI_SCHEMA_FILE = config('OPENAPI_SCHEMA_FILE', default=str(BASE_DIR / 'openapi-schema.json'))
+
 django_heroku.settings(locals())
+
+# Log requests over their query budget or with duplicated queries to the console handler set up by django_heroku,
+# QUERY_LOG_LEVEL=INFO logs the query counts and times of every request
+LOGGING['loggers']['api.instrumentation'] = {  # noqa: F821
+    'handlers': ['console'],
+    'level': config('QUERY_LOG_LEVEL', default='WARNING'),
+}
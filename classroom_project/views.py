@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+logger = logging.getLogger(__name__)
+
+
+def generate_schema():
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+@lru_cache(maxsize=None)
+def load_schema():
+    path = Path(settings.OPENAPI_SCHEMA_FILE)
+    if not path.exists():
+        logger.warning('%s does not exist, run `manage.py build_schema` on deploy. Generating the schema in this '
+                       'process instead.', path)
+        return generate_schema()
+    return json.loads(path.read_bytes())
+
+
+@lru_cache(maxsize=None)
+def render_schema(renderer_class, compress):
+    content = renderer_class().render(load_schema(), renderer_context={})
+    etag = hashlib.md5(content).hexdigest()
+    # the compressed variant is a different representation, with an ETag of its own
+    if compress:
+        return gzip.compress(content), quote_etag(f'{etag}-gzip')
+    return content, quote_etag(etag)
+
+
+def accepts_gzip(request):
+    # gzip, or * when gzip is not named, with a quality above 0
+    qualities = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, *params = [part.strip().lower() for part in coding.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+class SchemaView(SpectacularAPIView):
+    # outside of DEBUG the schema built by `manage.py build_schema` is served
+    # instead of introspecting every view and serializer on each request
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if settings.DEBUG:
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        compress = accepts_gzip(request)
+        content, etag = render_schema(type(renderer), compress)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f'{content_type}; charset={renderer.charset}'
+            response = HttpResponse(content, content_type=content_type)
+            if compress:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
@@ -1,16 +1,14 @@
-from classroom.models import Classroom
-from django.shortcuts import get_object_or_404
+from classroom.context import get_classroom_context
 from rest_framework.permissions import BasePermission
 
 
 class IsPartOfClassroomOrPostOnly(BasePermission):
     def has_permission(self, request, view):
-        code = view.kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        context = get_classroom_context(request, view.kwargs)
 
-        user = request.user
         if request.method == 'GET':
-            return classroom.is_user_part_of_classroom(user)
+            return context.is_member
 
         elif request.method == 'POST':
-            return True
+            # resolve the classroom so that an unknown code is still a 404
+            return context.classroom is not None
@@ -0,0 +1,81 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from django.http import Http404
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+BATCH_SIZE = 500
+
+
+def read_csv_emails(lines):
+    reader = csv.reader(lines)
+    header = [name.strip().lower() for name in next(reader, [])]
+    if 'email' not in header:
+        raise ParseError('The first row of the CSV has to name an email column')
+    column = header.index('email')
+    for row in reader:
+        if len(row) > column:
+            yield row[column]
+
+
+def read_ndjson_emails(lines):
+    # each line is an email or an object with one
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise ParseError(f'Line {number} is not valid JSON')
+        email = row.get('email') if isinstance(row, dict) else row
+        if not isinstance(email, str):
+            raise ParseError(f'Line {number} has no email')
+        yield email
+
+
+class RosterParser(BaseParser):
+    # leaves the body unread for import_roster, the format is named by the url.
+    # Authentication looks at request.POST, which would otherwise parse it first
+    media_type = '*/*'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream
+
+
+IMPORT_FORMATS = {'csv': read_csv_emails, 'ndjson': read_ndjson_emails}
+
+
+def get_unique_emails(emails):
+    # an email repeated in a later batch is reported once, as within a batch
+    seen = set()
+    for email in emails:
+        email = email.strip().lower()
+        if email and email not in seen:
+            seen.add(email)
+            yield email
+
+
+def import_roster(classroom, stream, import_format):
+    # the body is read line by line and enrolled in batches, only the report and the
+    # emails seen so far are kept for the whole roster. A malformed line rolls back
+    # every batch
+    try:
+        read_emails = IMPORT_FORMATS[import_format]
+    except KeyError:
+        raise Http404
+
+    lines = codecs.iterdecode(iter(stream.readline, b'') if stream is not None else [], 'utf-8-sig')
+    emails = get_unique_emails(read_emails(lines))
+    report = {'enrolled': [], 'already_enrolled': [], 'not_found': []}
+    try:
+        with transaction.atomic():
+            while batch := list(islice(emails, BATCH_SIZE)):
+                for outcome, batch_emails in classroom.enroll_students(batch).items():
+                    report[outcome] += batch_emails
+    except UnicodeDecodeError:
+        raise ParseError('The roster has to be encoded in UTF-8')
+    return report
@@ -0,0 +1,12 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class BulkEnrollSerializer(serializers.Serializer):
+    emails = serializers.ListField(child=serializers.EmailField(), allow_empty=False)
+
+    def validate_emails(self, value):
+        if len(value) > settings.BULK_ENROLL_MAX_STUDENTS:
+            raise serializers.ValidationError(f'At most {settings.BULK_ENROLL_MAX_STUDENTS} students can be enrolled '
+                                              f'at once, import larger rosters')
+        return value
@@ -1,3 +1,80 @@
+from unittest import mock
+
+from classroom.models import Classroom
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+class EnrollmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.teacher = User.objects.create(username='teacher', email='teacher@example.com')
+        self.enrolled = User.objects.create(username='enrolled', email='enrolled@example.com')
+        self.newcomers = [User.objects.create(username=f'newcomer{i}', email=f'Newcomer{i}@example.com')
+                          for i in range(2)]
+        self.classroom = Classroom.objects.create(teacher=self.teacher, name='Classroom', subject='Subject')
+        self.classroom.students.add(self.enrolled)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_bulk_enrollment(self):
+        url = reverse('students_bulk', kwargs={'code': self.classroom.code})
+        emails = ['newcomer0@example.com', ' NEWCOMER1@example.com', 'enrolled@example.com', 'teacher@example.com',
+                  'unknown@example.com', 'newcomer0@example.com']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'emails': emails}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'enrolled': ['newcomer0@example.com', 'newcomer1@example.com'],
+            'already_enrolled': ['enrolled@example.com', 'teacher@example.com'],
+            'not_found': ['unknown@example.com'],
+        })
+        self.assertEqual(set(self.classroom.students.all()), {self.enrolled, *self.newcomers})
+
+    def test_roster_import(self):
+        body = ('name,email\nNewcomer,newcomer0@example.com\nEnrolled,enrolled@example.com\n\n'
+                'Nobody,nobody@example.com\n')
+        url = reverse('students_import', kwargs={'code': self.classroom.code, 'import_format': 'csv'})
+        response = self.client.post(url, body, content_type='text/csv')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'enrolled': ['newcomer0@example.com'],
+                                         'already_enrolled': ['enrolled@example.com'],
+                                         'not_found': ['nobody@example.com']})
+
+    def test_roster_import_reports_repeated_emails_once(self):
+        body = '"newcomer0@example.com"\n"enrolled@example.com"\n"NEWCOMER0@example.com"\n"enrolled@example.com"\n'
+        url = reverse('students_import', kwargs={'code': self.classroom.code, 'import_format': 'ndjson'})
+        # every email in a batch of its own
+        with mock.patch('student.roster.BATCH_SIZE', 1):
+            response = self.client.post(url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'enrolled': ['newcomer0@example.com'],
+                                         'already_enrolled': ['enrolled@example.com'],
+                                         'not_found': []})
+
+    def test_malformed_import_enrolls_nobody(self):
+        body = '"newcomer0@example.com"\n{"name": "Newcomer"}\n'
+        url = reverse('students_import', kwargs={'code': self.classroom.code, 'import_format': 'ndjson'})
+        response = self.client.post(url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(self.classroom.students.all()), [self.enrolled])
+
+    def test_roles_are_forgotten_once_committed(self):
+        newcomer = self.newcomers[0]
+        self.assertIsNone(self.classroom.get_user_role(newcomer))
 
-# Create your tests here.
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.classroom.enroll_students([newcomer.email])
+            # the non-member role stays until the roster is committed
+            self.assertEqual(cache.get(self.classroom.get_role_cache_key(newcomer.id)), '')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.classroom.get_user_role(newcomer), 'student')
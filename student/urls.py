@@ -4,5 +4,7 @@ from . import views
 
 urlpatterns = [
     path('', views.Students.as_view(), name='students'),
+    path('bulk', views.BulkEnrollStudents.as_view(), name='students_bulk'),
+    path('import.<str:import_format>', views.ImportRoster.as_view(), name='students_import'),
     path('<int:student_id>', views.StudentsDetail.as_view(), name='students_detail'),
 ]
@@ -1,51 +1,73 @@
-from classroom.models import Classroom
+from classroom.context import get_classroom_context
 from classroom.permissions import IsTeacher
-from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from user.serializers import UserSerializer
 
 from student.permissions import IsPartOfClassroomOrPostOnly
 
+from .roster import RosterParser, import_roster
+from .serializers import BulkEnrollSerializer
+
 
 class Students(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsPartOfClassroomOrPostOnly]
     serializer_class = UserSerializer
+    ordering = ('id',)
 
     def get_queryset(self):
-        code = self.kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        classroom = get_classroom_context(self.request, self.kwargs).classroom
         return classroom.get_all_students()
 
     def post(self, request, **kwargs):
-        code = kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        context = get_classroom_context(request, kwargs)
+        classroom = context.classroom
         user = request.user
 
         # check if user is already part of this classroom
-        if classroom.is_user_part_of_classroom(user):
+        if context.is_member:
             return Response(status=status.HTTP_409_CONFLICT)
 
-        classroom.students.add(user)
+        classroom.add_student(user)
 
         serializer = UserSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class BulkEnrollStudents(APIView):
+    permission_classes = [IsAuthenticated, IsTeacher]
+    query_budget = 8
+
+    def post(self, request, **kwargs):
+        classroom = get_classroom_context(request, kwargs).classroom
+
+        serializer = BulkEnrollSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(classroom.enroll_students(serializer.validated_data['emails']))
+
+
+class ImportRoster(APIView):
+    permission_classes = [IsAuthenticated, IsTeacher]
+    parser_classes = [RosterParser]
+
+    def post(self, request, import_format, **kwargs):
+        classroom = get_classroom_context(request, kwargs).classroom
+        return Response(import_roster(classroom, request.stream, import_format))
+
+
 class StudentsDetail(generics.RetrieveAPIView, generics.DestroyAPIView):
     permission_classes = [IsAuthenticated, IsTeacher]
     serializer_class = UserSerializer
 
     def get_object(self):
-        student_id = self.kwargs['student_id']
-        return get_object_or_404(get_user_model(), id=student_id)
+        context = get_classroom_context(self.request, self.kwargs)
+        return context.get_user(self.kwargs['student_id'])
 
     def destroy(self, request, **kwargs):
-        code = kwargs['code']
-        classroom = get_object_or_404(Classroom, code=code)
+        classroom = get_classroom_context(request, kwargs).classroom
 
         student = self.get_object()
-        classroom.students.remove(student)
+        classroom.remove_student(student)
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,53 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from rest_framework.authentication import get_authorization_header
+
+
+def get_token_cache_key(token):
+    # the token itself never ends up in the cache
+    return f'access_token:{hashlib.sha256(token.encode()).hexdigest()}'
+
+
+def is_token_cache_shared():
+    # a token revoked in one worker is only forgotten by the cache of that worker
+    # when each worker keeps a local memory cache of its own
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def get_bearer_token(request):
+    auth = get_authorization_header(request).split()
+    # three parts are the "Bearer <backend> <token>" of SocialAuthentication
+    if len(auth) != 2 or auth[0].lower() != b'bearer':
+        return None
+    return auth[1].decode()
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    # remembers the user and access token of a validated token for
+    # ACCESS_TOKEN_CACHE_TIMEOUT seconds, or until the token expires if that
+    # is sooner. user/signals.py forgets them when the token or the user changes.
+    # Without a cache shared by all workers nothing is cached
+
+    def authenticate(self, request):
+        token = get_bearer_token(request)
+        if token is None or not is_token_cache_shared():
+            return super().authenticate(request)
+
+        key = get_token_cache_key(token)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = super().authenticate(request)
+        if result is not None:
+            _, access_token = result
+            timeout = min(settings.ACCESS_TOKEN_CACHE_TIMEOUT,
+                          int((access_token.expires - timezone.now()).total_seconds()))
+            if timeout > 0:
+                cache.set(key, result, timeout)
+        return result
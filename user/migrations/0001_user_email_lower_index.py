@@ -0,0 +1,19 @@
+# Generated by Django 4.0.2 on 2026-10-18 20:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    # auth.User is not ours to add Meta indexes to. Classroom.enroll_students
+    # looks students up by Lower('email'), which this expression index serves
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX user_email_lower_idx ON auth_user (LOWER(email))',
+            'DROP INDEX user_email_lower_idx',
+        ),
+    ]
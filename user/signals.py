@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from oauth2_provider.models import get_access_token_model
+
+from .authentication import get_token_cache_key
+
+AccessToken = get_access_token_model()
+
+
+# revoking a token and logging out delete it, refreshing or changing it saves it
+
+
+@receiver(post_save, sender=AccessToken)
+@receiver(post_delete, sender=AccessToken)
+def forget_access_token(sender, instance, **kwargs):
+    cache.delete(get_token_cache_key(instance.token))
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_access_tokens_of_user(sender, instance, created, **kwargs):
+    # the cached user would otherwise stay active or keep its old name
+    if created:
+        return
+    tokens = AccessToken.objects.filter(user=instance).values_list('token', flat=True)
+    cache.delete_many([get_token_cache_key(token) for token in tokens])
@@ -1,3 +1,38 @@
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model
+from rest_framework.test import APIClient
+
+from .authentication import get_token_cache_key
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create(username='user', email='user@example.com')
+        self.token = get_access_token_model().objects.create(
+            user=user, token='cached', expires=timezone.now() + timedelta(hours=1), scope='read write')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer cached')
+
+    def test_local_memory_cache_is_not_used(self):
+        self.assertEqual(self.client.get(reverse('user_details')).status_code, 200)
+        self.assertIsNone(cache.get(get_token_cache_key('cached')))
+
+        # another worker revoking the token can not leave it cached here
+        get_access_token_model().objects.filter(id=self.token.id).update(expires=timezone.now())
+        self.assertEqual(self.client.get(reverse('user_details')).status_code, 401)
+
+    def test_shared_cache_forgets_revoked_tokens(self):
+        with tempfile.TemporaryDirectory() as location, self.settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}):
+            self.assertEqual(self.client.get(reverse('user_details')).status_code, 200)
+            self.assertIsNotNone(cache.get(get_token_cache_key('cached')))
 
-# Create your tests here.
+            self.token.delete()
+            self.assertEqual(self.client.get(reverse('user_details')).status_code, 401)